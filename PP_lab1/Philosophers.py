@@ -1,8 +1,15 @@
 from mpi4py import MPI
+import argparse
 import time
 import sys
 import numpy as np
 
+# tags of the messages, by the fork of the receiver which the message is about
+LEFT = 1
+RIGHT = 2
+# how often the posted receives are tested while the Philosopher waits with a timeout
+POLL_INTERVAL = 0.001
+
 
 def print_tabs(rank):
     """
@@ -49,14 +56,16 @@ class Philosopher:
     """
     Class Philosopher represents one Philosopher.
     It solves 'The drinking Philosophers problem' by running the function 'run'.
+    A receive from both neighbours is always posted, so a request is handled as soon as it arrives.
     """
 
-    def __init__(self, comm, think, eat):
+    def __init__(self, comm, think, eat, handoff_delay=0.0):
         """
         Initializes one Philosopher object.
         :param comm: communicator
         :param think: thinking duration
         :param eat: eating duration
+        :param handoff_delay: simulated duration of sending the fork, 0 sends it at once
         """
         # communicator
         self._comm = comm
@@ -64,10 +73,16 @@ class Philosopher:
         self._size = self._comm.Get_size()
         # rank of the process
         self._rank = self._comm.Get_rank()
+        # rank of the Philosopher who sits left of the current one
+        self._left_rank = (self._rank - 1) % self._size
+        # rank of the Philosopher who sits right of the current one
+        self._right_rank = (self._rank + 1) % self._size
         # thinking duration
         self._thinking_time = think
         # eating duration
         self._eating_time = eat
+        # duration of sending the fork
+        self._handoff_delay = handoff_delay
         # True if Philosopher has both forks
         self._has_both_forks = False
         # left fork
@@ -75,8 +90,10 @@ class Philosopher:
         # right fork
         self._right_fork = None
         self.init_forks()
-        # queued requests
+        # queued requests, by the fork which is requested
         self._requests = []
+        # posted receives of the messages about the left and the right fork
+        self._receives = {side: self.post_receive(side) for side in (LEFT, RIGHT)}
 
     def init_forks(self):
         """
@@ -90,26 +107,52 @@ class Philosopher:
         elif self._rank != self._size-1:
             self._right_fork = Fork()
 
-    def think(self, left, right):
+    def post_receive(self, side):
         """
-        Function 'think' represents one thinking period of the Philosopher.
+        Posts the receive of the next message about the fork.
+        The left fork is shared with the left neighbour, and the right one with the right neighbour.
+        :param side: LEFT or RIGHT fork
+        :return: request of the receive
+        """
+        rank = self._left_rank if side == LEFT else self._right_rank
+        return self._comm.irecv(source=rank, tag=side)
+
+    def receive(self, sides, timeout=None):
+        """
+        Waits for the next message about one of the forks.
         Messages are represented as a tuple '(message_type(request or response), rank_of_the_sender)'
-        :param left: rank of the Philosopher who sits left of the current one
-        :param right: rank of the Philosopher who sits right of the current one
-        """
-        # listen for the requests
-        if not self._comm.Iprobe(source=int(left)) and not self._comm.Iprobe(source=int(right)):
-            time.sleep(1)
-        # receive request from the left process, and send back the response
-        if self._comm.Iprobe(source=int(left)):
-            message_left, sender_left = self._comm.recv(source=int(left))
-            self.send_response(sender_left)
-            self._left_fork = None
-        # receive request from the right process, and send back the response
-        if self._comm.Iprobe(source=int(right)):
-            message_right, sender_right = self._comm.recv(source=int(right))
-            self.send_response(sender_right, False)
-            self._right_fork = None
+        :param sides: forks whose messages are handled
+        :param timeout: maximum waiting time in seconds, or None to wait until the message arrives
+        :return: tuple (fork, message), or None if the timeout has passed
+        """
+        requests = [self._receives[side] for side in sides]
+        if timeout is None:
+            index, message = MPI.Request.waitany(requests)
+        else:
+            end = MPI.Wtime() + timeout
+            index, flag, message = MPI.Request.testany(requests)
+            while not flag:
+                remaining = end - MPI.Wtime()
+                if remaining <= 0:
+                    return None
+                time.sleep(min(POLL_INTERVAL, remaining))
+                index, flag, message = MPI.Request.testany(requests)
+        side = sides[index]
+        self._receives[side] = self.post_receive(side)
+        return side, message
+
+    def think(self):
+        """
+        Function 'think' represents one thinking period of the Philosopher.
+        While thinking, the Philosopher sends the requested forks as soon as the requests arrive.
+        """
+        end = MPI.Wtime() + self._thinking_time
+        while True:
+            received = self.receive((LEFT, RIGHT), end - MPI.Wtime())
+            if received is None:
+                return
+            side, (message, sender) = received
+            self.send_response(sender, side == LEFT)
 
     def send_response(self, rank, left=True):
         """
@@ -125,50 +168,54 @@ class Philosopher:
         if self._left_fork is None or self._right_fork is None:
             self._has_both_forks = False
 
-        self._comm.send(('response', self._rank), dest=int(rank))
-        time.sleep(0.5)
+        # the left fork is the right fork of the left neighbour
+        self._comm.send(('response', self._rank), dest=int(rank), tag=RIGHT if left else LEFT)
+        if self._handoff_delay > 0:
+            time.sleep(self._handoff_delay)
 
-    def send_request(self, rank):
+    def send_request(self, rank, left=True):
         """
         Function which sends a request for the fork to another Philosopher.
         :param rank: rank of the Philosopher to whom request will be sent
+        :param left: is the Philosopher left of the current one?
         """
-        self._comm.send(('request', self._rank), dest=int(rank))
+        self._comm.send(('request', self._rank), dest=int(rank), tag=RIGHT if left else LEFT)
 
-    def request_fork(self, rank, left=True):
+    def request_forks(self):
         """
-        Function 'request_fork' represents a behaviour of a Philosopher while requesting the fork.
-        :param rank: rank of the Philosopher to whom request will be sent
-        :param left: is the Philosopher left of the current one?
+        Function 'request_forks' represents a behaviour of a Philosopher while requesting the forks.
+        Both missing forks are requested at once, and the messages of both neighbours are handled
+        in the order in which they arrive, until the Philosopher has both forks.
         """
-        print(print_tabs(self._rank) + '(' + str(self._rank) + '): trazim vilicu')
-        sys.stdout.flush()
-        self.send_request(rank)
+        for side in (LEFT, RIGHT):
+            if (self._left_fork if side == LEFT else self._right_fork) is None:
+                print(print_tabs(self._rank) + '(' + str(self._rank) + '): trazim vilicu')
+                sys.stdout.flush()
+                self.send_request(self._left_rank if side == LEFT else self._right_rank, side == LEFT)
 
-        while True:
+        while self._left_fork is None or self._right_fork is None:
             # receive the message
-            message, sender = self._comm.recv(source=int(rank))
-            # if message is 'response', update the forks
+            side, (message, sender) = self.receive((LEFT, RIGHT))
+            fork = self._left_fork if side == LEFT else self._right_fork
+            # if message is 'response', the fork arrives clean
             if str(message) == 'response':
-                if left is True:
-                    self._left_fork = Fork()
-                    self._left_fork.clean_fork()
+                fork = Fork()
+                fork.clean_fork()
+                if side == LEFT:
+                    self._left_fork = fork
                 else:
-                    self._right_fork = Fork()
-                    self._right_fork.clean_fork()
-                return
-            # if message is 'request' and if wanted fork is dirty, send it, and if not - store the request for later
+                    self._right_fork = fork
+            # if message is 'request' and if wanted fork is dirty, send it and request it back,
+            # and if not - store the request for later
+            elif fork is not None and fork.clean is False:
+                self.send_response(sender, side == LEFT)
+                print(print_tabs(self._rank) + '(' + str(self._rank) + '): trazim vilicu')
+                sys.stdout.flush()
+                self.send_request(sender, side == LEFT)
             else:
-                if left is True:
-                    if self._left_fork.clean is False:
-                        self.send_response(rank)
-                    else:
-                        self._requests.append((message, sender))
-                else:
-                    if self._right_fork.clean is False:
-                        self.send_response(rank, False)
-                    else:
-                        self._requests.append((message, sender))
+                self._requests.append(side)
+
+        self._has_both_forks = True
 
     def eat(self):
         """
@@ -190,36 +237,21 @@ class Philosopher:
             print(print_tabs(self._rank) + '(' + str(self._rank) + '): mislim')
             sys.stdout.flush()
 
-            start = MPI.Wtime()
+            self.think()
 
-            # find rank of the Philosopher who sits left of the current one
-            left_rank = (self._rank - 1) % self._size
-            # find rank of the Philosopher who sits right of the current one
-            right_rank = (self._rank + 1) % self._size
-
-            # timer for the thinking period
-            while MPI.Wtime() - start < self._thinking_time:
-                self.think(left_rank, right_rank)
-
-            # if Philosopher doesn't have both forks
-            while self._has_both_forks is False:
-                if self._left_fork is None:
-                    # if left one is missing, send the request
-                    self.request_fork(left_rank)
-                if self._right_fork is None:
-                    # if right one is missing, send the request
-                    self.request_fork(right_rank, False)
-                if self._left_fork is not None and self._right_fork is not None:
-                    self._has_both_forks = True
+            # if Philosopher doesn't have both forks, request the missing ones
+            if self._has_both_forks is False:
+                self.request_forks()
 
             self.eat()
 
-            # send the remaining requests which have been stored
-            for msg, rnk in self._requests:
-                if int(rnk) == int(left_rank):
-                    self.send_response(rnk)
+            # send the remaining requests which have been stored, every one only once
+            for side in self._requests:
+                if side == LEFT:
+                    self.send_response(self._left_rank)
                 else:
-                    self.send_response(rnk, False)
+                    self.send_response(self._right_rank, False)
+            self._requests = []
 
 
 if __name__ == '__main__':
@@ -228,7 +260,16 @@ if __name__ == '__main__':
         print('Invalid number of processes! Number has to be greater than 1.')
         exit()
 
-    thinking_time = np.random.randint(1, 10)
-    eating_time = np.random.randint(1, 10)
+    parser = argparse.ArgumentParser(description='The drinking Philosophers problem.')
+    parser.add_argument('--think', type=float, default=None,
+                        help='thinking duration in seconds, by default a random one from 1 to 9')
+    parser.add_argument('--eat', type=float, default=None,
+                        help='eating duration in seconds, by default a random one from 1 to 9')
+    parser.add_argument('--handoff-delay', type=float, default=0.0,
+                        help='simulated duration of sending the fork in seconds')
+    arguments = parser.parse_args()
+
+    thinking_time = np.random.randint(1, 10) if arguments.think is None else arguments.think
+    eating_time = np.random.randint(1, 10) if arguments.eat is None else arguments.eat
 
-    Philosopher(MPI.COMM_WORLD, thinking_time, eating_time).run()
+    Philosopher(MPI.COMM_WORLD, thinking_time, eating_time, arguments.handoff_delay).run()
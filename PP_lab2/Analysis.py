@@ -0,0 +1,208 @@
+from Board import Board
+from Board import Player
+from Constants import *
+
+import Executors
+import Helper
+from Instrumentation import SearchStatistics
+import Scheduler
+from SelfPlay import parse_moves
+
+import argparse
+import itertools
+import os
+
+
+def default_depth(engine, time=None, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Depth of the search when it is not given.
+    :param engine: Name of the engine
+    :param time: Time budget for one move in seconds, or None
+    :param dimensions: Tuple (rows, columns, win length) of the board
+    :return: Depth of the search, or the maximum depth with the time budget
+    """
+    if time is not None:
+        return dimensions[0] * dimensions[1]
+    if engine == ENGINE_ALPHABETA:
+        return DEFAULT_ALPHABETA_DEPTH
+    if engine == ENGINE_HEURISTIC:
+        return DEFAULT_HEURISTIC_DEPTH
+    return DEFAULT_DEPTH
+
+
+def read_position(position, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Makes the board of the position. The position is a string with the columns of the moves,
+    as written by the function 'SelfPlay.format_moves', a pair (computer_mask, human_mask) of the bitboards,
+    or a Board.
+    :param position: The position
+    :param dimensions: Tuple (rows, columns, win length) of the board
+    :return: New Board with the position
+    """
+    board = Board(*dimensions)
+    if isinstance(position, Board):
+        board.set_position(position.computer_mask, position.human_mask)
+    elif isinstance(position, str):
+        for col in parse_moves(position, board.columns):
+            if board.moves > 0 and Helper.is_game_finished(board, col):
+                raise ValueError('The game is over before the move ' + str(col) + ' in ' + position + '!')
+            if not Helper.is_move_legal(board, col):
+                raise ValueError('Illegal move ' + str(col) + ' in ' + position + '!')
+            board.make_a_move(col)
+    else:
+        computer_mask, human_mask = position
+        board.set_position(int(computer_mask), int(human_mask))
+    return board
+
+
+def is_over(board):
+    """
+    Checks if there is no move to search in the position.
+    :param board: The game board
+    :return: True if the game is won or the board is full
+    """
+    # the column is not needed, only the last player can have the line
+    return board.moves == board.cells or (board.moves > 0 and Helper.is_game_finished(board, NO_COLUMN))
+
+
+class Analyzer:
+    """
+    Class Analyzer evaluates many positions with one pool of the workers, without the game loop.
+    The positions are searched in batches which share the workers, the same position is searched only once,
+    and the results are given as soon as they are known:
+
+        with Analyzer(engine='alphabeta', depth=8) as analyzer:
+            for index, evaluations, best_col in analyzer.analyze(['33', '3342', '0011223']):
+                print(index, best_col)
+    """
+    def __init__(self, executor=None, engine=DEFAULT_ENGINE, depth=None, time=None, dimensions=DEFAULT_DIMENSIONS,
+                 processes=None, endgame=ENDGAME_CELLS, shared_bounds=False, shared_table=False):
+        """
+        Initialization method.
+        :param executor: MPIExecutor or LocalExecutor which runs the tasks, or None to start the local workers
+        :param engine: Name of the engine, it has to be the engine of the workers of the given executor
+        :param depth: Depth of the search, or None for the default depth of the engine
+        :param time: Time budget for one position in seconds, or None
+        :param dimensions: Tuple (rows, columns, win length) of the board
+        :param processes: Number of the local workers, or None for one per CPU
+        :param endgame: The positions with at most this many empty cells are solved, 0 turns it off
+        :param shared_bounds: True if the alpha-beta windows are shared between the tasks
+        :param shared_table: True if the started local workers share the transposition table
+        """
+        if shared_bounds and engine != ENGINE_ALPHABETA:
+            raise ValueError('The shared bounds need the alpha-beta engine!')
+        if depth is None:
+            depth = default_depth(engine, time, dimensions)
+        self._arguments = argparse.Namespace(engine=engine, depth=depth, time=time, dimensions=dimensions,
+                                             endgame=endgame, shared_bounds=shared_bounds, bound_columns=False)
+        # the workers are stopped by 'close' only if they have been started here
+        self._own_executor = executor is None
+        if executor is None:
+            executor = Executors.LocalExecutor(processes or os.cpu_count(), engine, dimensions, shared_table)
+        self._executor = executor
+        self._statistics = SearchStatistics()
+        self._task_ids = itertools.count()
+
+    @property
+    def statistics(self):
+        """
+        Getter for the statistics property.
+        :return: SearchStatistics of all searches of the analyzer
+        """
+        return self._statistics
+
+    def analyze(self, positions, batch=ANALYSIS_BATCH):
+        """
+        Evaluates the positions. The positions are read while the earlier ones are searched,
+        so the iterable can be a stream of a large log.
+        :param positions: Iterable of the positions, every one is accepted by the function 'read_position'
+        :param batch: Maximum number of the positions which are searched at the same time
+        :return: Generator of the tuples (index, evaluations by the column, best column) in the order
+                 in which the searches finish; the evaluations are None and the best column is NO_COLUMN
+                 if the game is already over, and with the shared bounds the columns which can't be the best one
+                 are BOUNDED_COLUMN
+        """
+        scheduler = Scheduler.Scheduler(self._executor, self._statistics)
+        # the tasks are split only if there are fewer positions than workers
+        workers = max(1, scheduler.workers // batch)
+        positions = enumerate(positions)
+        # results of the finished positions and the searches of the running ones, by the hash of the position
+        finished = {}
+        searches = {}
+        # the hash of the position by its running search round
+        running = {}
+
+        def start(key, move_search):
+            search_round = move_search.next_round()
+            if search_round is None:
+                return False
+            running[search_round.task_id] = key
+            scheduler.add(search_round)
+            return True
+
+        try:
+            while True:
+                # fill up the batch
+                while len(searches) < batch:
+                    index, position = next(positions, (None, None))
+                    if index is None:
+                        break
+                    board = read_position(position, self._arguments.dimensions)
+                    key = board.hash
+                    if key in finished:
+                        yield (index,) + finished[key]
+                    elif key in searches:
+                        searches[key][2].append(index)
+                    elif is_over(board):
+                        yield index, None, NO_COLUMN
+                    else:
+                        move_search = Scheduler.MoveSearch(board, self._arguments, self._task_ids, workers,
+                                                           self._statistics)
+                        searches[key] = (board, move_search, [index])
+                        start(key, move_search)
+
+                if not searches:
+                    return
+                for search_round in scheduler.step():
+                    key = running.pop(search_round.task_id)
+                    board, move_search, indices = searches[key]
+                    move_search.finish_round(search_round)
+                    if start(key, move_search):
+                        continue
+
+                    # the search of the position is finished
+                    del searches[key]
+                    player = Player.COMPUTER if board.last_player == Player.HUMAN else Player.HUMAN
+                    results = move_search.results
+                    finished[key] = (results, Helper.get_best_column(results, self._arguments.engine, player))
+                    for index in indices:
+                        yield (index,) + finished[key]
+        finally:
+            # the consumer can stop early, the running rounds are cancelled and collected
+            for task_id in running:
+                scheduler.cancel(task_id)
+            while scheduler.active:
+                scheduler.step()
+
+    def close(self):
+        """
+        Stops the workers if they have been started by the analyzer.
+        """
+        if self._own_executor:
+            self._executor.close()
+
+    def __enter__(self):
+        """
+        Enters the with block.
+        :return: The analyzer
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Stops the workers at the end of the with block.
+        :param exc_type: Type of the exception, or None
+        :param exc_value: The exception, or None
+        :param traceback: Traceback of the exception, or None
+        """
+        self.close()
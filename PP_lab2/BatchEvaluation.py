@@ -0,0 +1,144 @@
+from Constants import *
+from Board import Player
+
+import numpy as np
+
+
+def fits(board):
+    """
+    Checks if the bitboards of the board fit into the 64 bit integers of NumPy.
+    :param board: The game board
+    :return: True if the board can be evaluated with NumPy
+    """
+    return board.columns * board.column_height <= 64
+
+
+def is_aligned(masks, shift, length=DEFAULT_WIN_LENGTH):
+    """
+    Vectorized check if the given number of tokens are aligned in the given direction.
+    :param masks: Array of bitboards
+    :param shift: Distance between two neighbouring cells of the line in the bitboard
+    :param length: Number of tokens in the line
+    :return: Array of booleans, True where there are enough
+    """
+    run = 1
+    while run * 2 <= length:
+        masks = masks & (masks >> np.uint64(run * shift))
+        run *= 2
+    if run < length:
+        masks = masks & (masks >> np.uint64((length - run) * shift))
+    return masks != 0
+
+
+def is_won(masks, height, length=DEFAULT_WIN_LENGTH):
+    """
+    Vectorized check if the bitboards have a winning line in any direction.
+    :param masks: Array of bitboards
+    :param height: Number of bits reserved for one column
+    :param length: Number of tokens in a line which win the game
+    :return: Array of booleans, True where the game is won
+    """
+    won = np.zeros(masks.shape, dtype=bool)
+    for shift in (1, height, height + 1, height - 1):
+        won |= is_aligned(masks, shift, length)
+    return won
+
+
+def expand(moved, to_move, alive, board):
+    """
+    Makes every move from every alive position.
+    :param moved: Bitboards of the player who made the last move
+    :param to_move: Bitboards of the player whose move it is
+    :param alive: Array of booleans, True for the positions which should be expanded
+    :param board: Board with the dimensions
+    :return: Bitboards of the children as (moved, to_move, alive, won), every array has 'columns' times more items
+    """
+    height = board.column_height
+    occupied = moved | to_move
+    children_moved = np.empty((len(moved), board.columns), dtype=np.uint64)
+    legal = np.empty((len(moved), board.columns), dtype=bool)
+
+    for column in range(board.columns):
+        bottom = np.uint64(1 << (column * height))
+        top = np.uint64(1 << (column * height + board.rows - 1))
+        column_mask = np.uint64(((1 << board.rows) - 1) << (column * height))
+        legal[:, column] = alive & ((occupied & top) == 0)
+        # the lowest empty cell of the column
+        children_moved[:, column] = to_move | ((occupied + bottom) & column_mask)
+
+    children_moved = children_moved.ravel()
+    children_to_move = np.repeat(moved, board.columns)
+    legal = legal.ravel()
+    won = legal & is_won(children_moved, height, board.win_length)
+    return children_moved, children_to_move, legal, won
+
+
+def reduce_level(values, alive, mover_win, columns):
+    """
+    Combines the evaluations of the children into the evaluations of the parents, the same way 'evaluate' does.
+    :param values: Evaluations of the children
+    :param alive: Array of booleans, True for the children which exist
+    :param mover_win: Evaluation of a win for the player who makes the moves to the children
+    :param columns: Number of the columns
+    :return: Evaluations of the parents
+    """
+    values = values.reshape(-1, columns)
+    alive = alive.reshape(-1, columns)
+    moves = alive.sum(axis=1)
+
+    # the children are added in the order of the columns, like in the recursive search
+    total = np.zeros(len(values), dtype=np.float64)
+    for column in range(columns):
+        total = total + np.where(alive[:, column], values[:, column], 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = total / moves
+    result = np.where(np.all(~alive | (values == PLAYER_WIN), axis=1), PLAYER_WIN, result)
+    result = np.where(np.all(~alive | (values == COMPUTER_WIN), axis=1), COMPUTER_WIN, result)
+    result = np.where(np.any(alive & (values == mover_win), axis=1), mover_win, result)
+    # the board is full
+    return np.where(moves == 0, TIE, result)
+
+
+def evaluate_frontier(board, depth):
+    """
+    Evaluates the board with the averaging search, but all positions of the next 'depth' moves are
+    generated at once, their wins are checked with NumPy, and the results are reduced level by level.
+    The position on the board must not be finished, and the board must fit into 64 bits.
+    :param board: The game board
+    :param depth: Depth of the search
+    :return: Tuple (evaluation, number of the generated positions)
+    """
+    if board.last_player == Player.COMPUTER:
+        moved, to_move = board.computer_mask, board.human_mask
+        mover_win = PLAYER_WIN
+    else:
+        moved, to_move = board.human_mask, board.computer_mask
+        mover_win = COMPUTER_WIN
+
+    moved = np.array([moved], dtype=np.uint64)
+    to_move = np.array([to_move], dtype=np.uint64)
+    alive = np.ones(1, dtype=bool)
+    levels = []
+    nodes = 0
+
+    # generate the frontier, the finished positions are not expanded
+    for level in range(depth):
+        moved, to_move, children_alive, won = expand(moved, to_move, alive, board)
+        levels.append((children_alive, won))
+        nodes += int(children_alive.sum())
+        alive = children_alive & ~won
+
+    # the positions at the end of the search are ties, unless they are won
+    children_alive, won = levels[-1]
+    mover = mover_win if depth % 2 == 1 else -mover_win
+    values = np.where(won, mover, TIE).astype(np.float64)
+
+    for level in range(depth - 1, 0, -1):
+        parents_alive, parents_won = levels[level - 1]
+        parents_mover = -mover
+        values = reduce_level(values, children_alive, mover, board.columns)
+        values = np.where(parents_won, parents_mover, values)
+        children_alive, mover = parents_alive, parents_mover
+
+    return float(reduce_level(values, children_alive, mover, board.columns)[0]), nodes
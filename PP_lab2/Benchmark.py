@@ -0,0 +1,300 @@
+from Board import Board
+from Constants import *
+
+import Executors
+import Helper
+import Hierarchy
+from Instrumentation import SearchStatistics
+import Scheduler
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+# positions of the benchmark, given by the columns of the moves from the empty board,
+# the computer is on the move in every one of them
+POSITIONS = ['3', '333', '32334', '2343432', '334224315', '33322445560', '5234605226142004603062300651456']
+# columns of the results
+FIELDS = ['backend', 'engine', 'depth', 'processes', 'positions', 'wall_time', 'nodes', 'nodes_per_second',
+          'speedup', 'efficiency']
+
+
+def parse_arguments():
+    """
+    Parses the command line arguments.
+    :return: Parsed arguments
+    """
+    processes = sorted({1, 2, 4, os.cpu_count()} - {None})
+    parser = argparse.ArgumentParser(description='Benchmark of the Connect4 parallel search.')
+    parser.add_argument('--engine', choices=sorted(Helper.ENGINES), default=DEFAULT_ENGINE,
+                        help='search engine')
+    parser.add_argument('--shared-bounds', action='store_true',
+                        help='share the alpha-beta windows between the tasks, only for the alpha-beta engine; '
+                             'the columns which can\'t be the best one get only a bound')
+    parser.add_argument('--shared-table', action='store_true',
+                        help='share the transposition table between the workers on the same machine')
+    parser.add_argument('--hierarchical', action='store_true',
+                        help='the MPI runs send the tasks through one sub-master per machine')
+    parser.add_argument('--depths', type=int, nargs='+', default=BENCHMARK_DEPTHS,
+                        help='depths of the search')
+    parser.add_argument('--processes', type=int, nargs='+', default=processes,
+                        help='numbers of the worker processes, the MPI runs have one more rank for the master')
+    parser.add_argument('--backends', choices=[BACKEND_MPI, BACKEND_LOCAL], nargs='+', default=[BACKEND_LOCAL],
+                        help='backends which are measured')
+    parser.add_argument('--repeats', type=int, default=BENCHMARK_REPEATS,
+                        help='number of the runs of every measurement, the fastest one is kept')
+    parser.add_argument('--mpiexec', default='mpiexec',
+                        help='command which starts the MPI runs')
+    parser.add_argument('--csv', default=None,
+                        help='file which gets the results as CSV')
+    parser.add_argument('--json', default=None,
+                        help='file which gets the results as JSON')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results of an earlier run which are compared with this run')
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE,
+                        help='allowed relative slowdown against the baseline')
+    # used by the benchmark itself to run one measurement under mpiexec
+    parser.add_argument('--mpi-run', action='store_true', help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.shared_bounds and arguments.engine != ENGINE_ALPHABETA:
+        parser.error('the shared bounds need the alpha-beta engine')
+    return arguments
+
+
+def setup_board(moves):
+    """
+    Plays the moves on an empty board.
+    :param moves: String with the columns of the moves
+    :return: The game board
+    """
+    board = Board()
+    for col in moves:
+        board.make_a_move(int(col))
+    return board
+
+
+def measure(executor, engine, depth, shared_bounds=False):
+    """
+    Searches all benchmark positions.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param engine: Name of the engine
+    :param depth: Depth of the search
+    :param shared_bounds: True if the alpha-beta windows are shared between the tasks
+    :return: Tuple (wall time in seconds, number of the visited nodes)
+    """
+    # the engine is measured, so the positions are never solved
+    arguments = argparse.Namespace(engine=engine, depth=depth, time=None, shared_bounds=shared_bounds,
+                                   bound_columns=False, endgame=0)
+    task_ids = itertools.count()
+    statistics = SearchStatistics()
+    wall_time = 0.0
+
+    for moves in POSITIONS:
+        board = setup_board(moves)
+        start = time.time()
+        Scheduler.search(executor, board, arguments, task_ids, statistics)
+        wall_time += time.time() - start
+
+    return wall_time, statistics.nodes
+
+
+def run_local(processes, engine, depth, shared_bounds=False, shared_table=False):
+    """
+    Measures the search with the local worker processes.
+    The workers are started for every measurement, so their transposition tables are empty.
+    :param processes: Number of the worker processes
+    :param engine: Name of the engine
+    :param depth: Depth of the search
+    :param shared_bounds: True if the alpha-beta windows are shared between the tasks
+    :param shared_table: True if the workers share the transposition table
+    :return: Tuple (wall time in seconds, number of the visited nodes)
+    """
+    executor = Executors.LocalExecutor(processes, engine, shared_table=shared_table)
+    try:
+        return measure(executor, engine, depth, shared_bounds)
+    finally:
+        executor.close()
+
+
+def run_mpi(processes, engine, depth, mpiexec, shared_bounds=False, shared_table=False, hierarchical=False):
+    """
+    Measures the search with the MPI workers. Every measurement is a new mpiexec run of this script.
+    :param processes: Number of the worker processes
+    :param engine: Name of the engine
+    :param depth: Depth of the search
+    :param mpiexec: Command which starts the MPI runs
+    :param shared_bounds: True if the alpha-beta windows are shared between the tasks
+    :param shared_table: True if the workers on the same machine share the transposition table
+    :param hierarchical: True if the master sends the tasks through one sub-master per machine
+    :return: Tuple (wall time in seconds, number of the visited nodes)
+    """
+    command = shlex.split(mpiexec) + ['-n', str(processes + 1), sys.executable, os.path.abspath(__file__),
+                                      '--mpi-run', '--engine', engine, '--depths', str(depth)]
+    if shared_bounds:
+        command.append('--shared-bounds')
+    if shared_table:
+        command.append('--shared-table')
+    if hierarchical:
+        command.append('--hierarchical')
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['wall_time'], result['nodes']
+
+
+def mpi_run(arguments):
+    """
+    One measurement under mpiexec. The master prints the result as JSON.
+    :param arguments: Parsed command line arguments
+    """
+    from mpi4py import MPI
+
+    communicator = MPI.COMM_WORLD
+    local = None
+    slots = None
+    if arguments.hierarchical:
+        communicator, local, slots = Hierarchy.split_nodes(MPI.COMM_WORLD)
+    if MPI.COMM_WORLD.rank == 0:
+        executor = Executors.MPIExecutor(communicator, arguments.shared_table and not arguments.hierarchical, slots)
+        try:
+            wall_time, nodes = measure(executor, arguments.engine, arguments.depths[0], arguments.shared_bounds)
+        finally:
+            executor.close()
+        print(json.dumps({'wall_time': wall_time, 'nodes': nodes}))
+    elif communicator is not None and local is not None:
+        Hierarchy.sub_master(communicator, local, arguments.engine, shared_table=arguments.shared_table)
+    else:
+        Executors.mpi_worker(local or communicator, arguments.engine, shared_table=arguments.shared_table)
+
+
+def add_speedup(rows):
+    """
+    Calculates the speedup and the efficiency of every result against the result with the fewest processes,
+    for the same backend, engine and depth.
+    :param rows: List of the results, they get the speedup and the efficiency
+    """
+    for row in rows:
+        base = min((other for other in rows if all(other[key] == row[key] for key in ('backend', 'engine', 'depth'))),
+                   key=lambda other: other['processes'])
+        row['speedup'] = base['wall_time'] / row['wall_time'] if row['wall_time'] > 0 else 0.0
+        row['efficiency'] = row['speedup'] * base['processes'] / row['processes']
+
+
+def write_csv(path, rows):
+    """
+    Writes the results as CSV.
+    :param path: Path of the file
+    :param rows: List of the results
+    """
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_json(path, rows):
+    """
+    Writes the results as JSON.
+    :param path: Path of the file
+    :param rows: List of the results
+    """
+    with open(path, 'w') as json_file:
+        json.dump(rows, json_file, indent=2)
+
+
+def print_rows(rows):
+    """
+    Prints the results as a table.
+    :param rows: List of the results
+    """
+    print('\t'.join(FIELDS))
+    for row in rows:
+        print('\t'.join(FORMATTING.format(row[key]) if isinstance(row[key], float) else str(row[key])
+                        for key in FIELDS))
+
+
+def compare(rows, path, tolerance):
+    """
+    Compares the results with the baseline and prints the ratios of the wall times and the nodes.
+    :param rows: List of the results
+    :param path: Path of the JSON baseline
+    :param tolerance: Allowed relative slowdown
+    :return: List of the results which are slower than the baseline
+    """
+    with open(path) as json_file:
+        baseline = json.load(json_file)
+    keys = ('backend', 'engine', 'depth', 'processes')
+    baseline = {tuple(row[key] for key in keys): row for row in baseline}
+    regressions = []
+
+    print('backend\tengine\tdepth\tprocesses\ttime_ratio\tnodes_ratio')
+    for row in rows:
+        old = baseline.get(tuple(row[key] for key in keys))
+        if old is None:
+            continue
+        time_ratio = row['wall_time'] / old['wall_time'] if old['wall_time'] > 0 else 1.0
+        nodes_ratio = row['nodes'] / old['nodes'] if old['nodes'] > 0 else 1.0
+        print('\t'.join(str(row[key]) for key in keys) + '\t' + FORMATTING.format(time_ratio) + '\t' +
+              FORMATTING.format(nodes_ratio))
+        if time_ratio > 1 + tolerance:
+            regressions.append(row)
+
+    return regressions
+
+
+def main(arguments):
+    """
+    Runs all measurements, writes the results and compares them with the baseline.
+    :param arguments: Parsed command line arguments
+    :return: Exit status, 1 if there are regressions
+    """
+    rows = []
+
+    for backend, depth, processes in itertools.product(arguments.backends, arguments.depths, arguments.processes):
+        runs = []
+        for _ in range(arguments.repeats):
+            if backend == BACKEND_LOCAL:
+                runs.append(run_local(processes, arguments.engine, depth, arguments.shared_bounds,
+                                          arguments.shared_table))
+            else:
+                runs.append(run_mpi(processes, arguments.engine, depth, arguments.mpiexec, arguments.shared_bounds,
+                                        arguments.shared_table, arguments.hierarchical))
+        wall_time, nodes = min(runs)
+        rows.append({'backend': backend, 'engine': arguments.engine, 'depth': depth, 'processes': processes,
+                     'positions': len(POSITIONS), 'wall_time': wall_time, 'nodes': nodes,
+                     'nodes_per_second': nodes / wall_time if wall_time > 0 else 0.0})
+        print(backend + ', depth ' + str(depth) + ', ' + str(processes) + ' processes: ' +
+              FORMATTING.format(wall_time) + ' s')
+        sys.stdout.flush()
+
+    add_speedup(rows)
+    print_rows(rows)
+    if arguments.csv is not None:
+        write_csv(arguments.csv, rows)
+    if arguments.json is not None:
+        write_json(arguments.json, rows)
+
+    if arguments.baseline is not None:
+        regressions = compare(rows, arguments.baseline, arguments.tolerance)
+        if regressions:
+            print(str(len(regressions)) + ' measurements are slower than the baseline')
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    """
+    Benchmark of the parallel search on the fixed positions.
+    It runs by entering 'python Benchmark.py [--backends local mpi] [--processes 1 2 4 8] [--depths 4 6]
+    [--json results.json] [--baseline baseline.json]' into the terminal.
+    """
+    arguments = parse_arguments()
+    if arguments.mpi_run:
+        mpi_run(arguments)
+    else:
+        sys.exit(main(arguments))
@@ -1,4 +1,7 @@
 from Constants import *
+from StaticEvaluation import StaticEvaluator
+
+import random
 
 
 class Player:
@@ -9,33 +12,119 @@ class Player:
     HUMAN = 2
 
 
+def init_zobrist(cells):
+    """
+    Generates random keys for the Zobrist hashing, one for every cell and every player.
+    The generator is seeded, so every process gets the same keys.
+    :param cells: Number of cells in the bitboard
+    :return: Keys of the computer and keys of the player
+    """
+    generator = random.Random(ZOBRIST_SEED)
+    computer_keys = [generator.getrandbits(64) for x in range(cells)]
+    human_keys = [generator.getrandbits(64) for x in range(cells)]
+    return computer_keys, human_keys
+
+
+# keys of the Zobrist hashing by the number of cells in the bitboard
+ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(cells):
+    """
+    Keys of the Zobrist hashing, they are generated once for every size of the bitboard.
+    :param cells: Number of cells in the bitboard
+    :return: Keys of the computer and keys of the player
+    """
+    if cells not in ZOBRIST_KEYS:
+        ZOBRIST_KEYS[cells] = init_zobrist(cells)
+    return ZOBRIST_KEYS[cells]
+
+
 class Board:
     """
     Class Board represents a board for Connect4 game.
     It contains methods for the manipulation of a board.
+
+    The board is stored as two bitboards, one per player, and the heights of the columns.
+    Column c occupies bits c * (rows + 1) up to c * (rows + 1) + rows - 1, from the bottom up.
+    The extra bit on top of every column is always empty, so lines can't wrap into the next column.
+    The bitboards are Python integers, so they have as many bits as the board needs.
     """
-    def __init__(self):
+    def __init__(self, rows=DEFAULT_ROWS, columns=DEFAULT_COLUMNS, win_length=DEFAULT_WIN_LENGTH):
         """
         Initialization method.
+        :param rows: Number of rows
+        :param columns: Number of columns
+        :param win_length: Number of tokens in a line which win the game
         """
-        self._rows = BOARD_SIZE
-        self._columns = BOARD_SIZE
-        self._board = self.init_board()
+        if rows < 1 or columns < 1 or win_length < 2:
+            raise ValueError('Wrong board dimensions!')
+        self._rows = rows
+        self._columns = columns
+        self._win_length = win_length
+        # number of bits reserved for one column
+        self._column_height = self._rows + 1
+        self._computer_keys, self._human_keys = zobrist_keys(self._columns * self._column_height)
+        # tokens of the computer and of the player
+        self._computer_mask = 0
+        self._human_mask = 0
+        # number of tokens in every column
+        self._heights = self.init_heights()
+        # number of tokens on the board
+        self._moves = 0
+        # Zobrist hash of the position, updated with every move
+        self._hash = 0
+        # Zobrist hash of the mirrored position, where the columns are in the reverse order
+        self._mirror_hash = 0
         # first move should be done by the player
         self._last_player = Player.COMPUTER
+        # static evaluation, it is created by the first call of 'static_evaluation'
+        self._evaluator = None
+
+    def init_heights(self):
+        """
+        Initializes the column heights.
+        :return: Heights of the empty board
+        """
+        return [0 for x in range(self._columns)]
 
-    def init_board(self):
+    def set_position(self, computer_mask, human_mask):
         """
-        Initializes a board.
-        :return: Empty board
+        Replaces the position on the board with the one given by the bitboards.
+        The player who made the last move is found from the number of tokens.
+        :param computer_mask: Bitboard of the computer tokens
+        :param human_mask: Bitboard of the player tokens
         """
-        return [[DEFAULT_VALUE for x in range(self._columns)] for y in range(self._rows)]
+        self._computer_mask = computer_mask
+        self._human_mask = human_mask
+        self._hash = 0
+        self._mirror_hash = 0
+        self._moves = 0
+        for column in range(self._columns):
+            height = 0
+            index = column * self._column_height
+            mirror_index = (self._columns - 1 - column) * self._column_height
+            while height < self._rows and (computer_mask | human_mask) >> (index + height) & 1:
+                if computer_mask >> (index + height) & 1:
+                    self._hash ^= self._computer_keys[index + height]
+                    self._mirror_hash ^= self._computer_keys[mirror_index + height]
+                else:
+                    self._hash ^= self._human_keys[index + height]
+                    self._mirror_hash ^= self._human_keys[mirror_index + height]
+                height += 1
+            self._heights[column] = height
+            self._moves += height
+        # the player makes the first move
+        self._last_player = Player.HUMAN if self._moves % 2 == 1 else Player.COMPUTER
+        if self._evaluator is not None:
+            self._evaluator = StaticEvaluator(self._rows, self._columns, self._column_height, self._win_length,
+                                              computer_mask, human_mask)
 
     def print_out_board(self):
         """
         Prints out the current state of the board.
         """
-        print('\n'.join([''.join(['{:1}'.format(item) for item in row]) for row in self._board]))
+        print('\n'.join([''.join(['{:1}'.format(item) for item in row]) for row in self.board]))
 
     def make_a_move(self, column):
         """
@@ -43,32 +132,116 @@ class Board:
         :param column: Column to which token will be put
         :return: void
         """
-        if column < MIN_COLUMN_SIZE or column > MAX_COLUMN_SIZE:
+        if column < 0 or column >= self._columns:
             raise IndexError('Wrong column index!')
 
-        for row in range(BOARD_SIZE)[::-1]:
-            if self._board[row][column] == DEFAULT_VALUE:
-                if self._last_player == Player.COMPUTER:
-                    self._board[row][column] = HUMAN
-                    self._last_player = Player.HUMAN
-                else:
-                    self._board[row][column] = COMPUTER
-                    self._last_player = Player.COMPUTER
-                break
+        height = self._heights[column]
+        if height == self._rows:
+            return
+
+        index = column * self._column_height + height
+        mirror_index = (self._columns - 1 - column) * self._column_height + height
+        move = 1 << index
+        if self._last_player == Player.COMPUTER:
+            self._human_mask |= move
+            self._hash ^= self._human_keys[index]
+            self._mirror_hash ^= self._human_keys[mirror_index]
+            self._last_player = Player.HUMAN
+        else:
+            self._computer_mask |= move
+            self._hash ^= self._computer_keys[index]
+            self._mirror_hash ^= self._computer_keys[mirror_index]
+            self._last_player = Player.COMPUTER
+        self._heights[column] = height + 1
+        self._moves += 1
+        if self._evaluator is not None:
+            self._evaluator.add(index, self._last_player == Player.COMPUTER)
 
     def undo_last_move(self, column):
         """
         Undo the last move of the game from the given column.
         :param column: Column from which the token should be removed
         """
-        for row in range(BOARD_SIZE):
-            if self._board[row][column] != DEFAULT_VALUE:
-                self._board[row][column] = DEFAULT_VALUE
-                if self._last_player == Player.COMPUTER:
-                    self._last_player = Player.HUMAN
-                else:
-                    self._last_player = Player.COMPUTER
-                break
+        height = self._heights[column]
+        if height == 0:
+            return
+
+        index = column * self._column_height + height - 1
+        mirror_index = (self._columns - 1 - column) * self._column_height + height - 1
+        move = 1 << index
+        if self._evaluator is not None:
+            self._evaluator.remove(index, self._computer_mask & move != 0)
+        if self._computer_mask & move:
+            self._computer_mask &= ~move
+            self._hash ^= self._computer_keys[index]
+            self._mirror_hash ^= self._computer_keys[mirror_index]
+        else:
+            self._human_mask &= ~move
+            self._hash ^= self._human_keys[index]
+            self._mirror_hash ^= self._human_keys[mirror_index]
+        self._heights[column] = height - 1
+        self._moves -= 1
+        if self._last_player == Player.COMPUTER:
+            self._last_player = Player.HUMAN
+        else:
+            self._last_player = Player.COMPUTER
+
+    def mirror_mask(self, mask):
+        """
+        Mirrors the bitboard, the columns are put in the reverse order.
+        :param mask: Bitboard
+        :return: Mirrored bitboard
+        """
+        column_mask = (1 << self._column_height) - 1
+        mirrored = 0
+        for column in range(self._columns):
+            bits = mask >> (column * self._column_height) & column_mask
+            mirrored |= bits << ((self._columns - 1 - column) * self._column_height)
+        return mirrored
+
+    def is_symmetric(self):
+        """
+        Checks if the position is the same as its mirror image.
+        :return: True if the position is symmetric, False otherwise
+        """
+        return (self._hash == self._mirror_hash and
+                self.mirror_mask(self._computer_mask) == self._computer_mask and
+                self.mirror_mask(self._human_mask) == self._human_mask)
+
+    def static_evaluation(self):
+        """
+        Evaluates the position without the search. The counters of the evaluation are made
+        by the first call, and then they are updated with every move.
+        :return: Evaluation from the perspective of the computer, between PLAYER_WIN and COMPUTER_WIN
+        """
+        if self._evaluator is None:
+            self._evaluator = StaticEvaluator(self._rows, self._columns, self._column_height, self._win_length,
+                                              self._computer_mask, self._human_mask)
+        return self._evaluator.evaluation()
+
+    def height(self, column):
+        """
+        Number of tokens in the given column.
+        :param column: Column index
+        :return: Height of the column
+        """
+        return self._heights[column]
+
+    def is_column_full(self, column):
+        """
+        Checks if there is no more space in the given column.
+        :param column: Column index
+        :return: True if the column is full, False otherwise
+        """
+        return self._heights[column] == self._rows
+
+    @property
+    def moves(self):
+        """
+        Getter for the moves property.
+        :return: Number of tokens on the board
+        """
+        return self._moves
 
     @property
     def last_player(self):
@@ -78,10 +251,99 @@ class Board:
         """
         return self._last_player
 
+    @property
+    def last_player_mask(self):
+        """
+        Getter for the bitboard of the player who made the last move.
+        :return: Bitboard of the last player
+        """
+        if self._last_player == Player.HUMAN:
+            return self._human_mask
+        return self._computer_mask
+
+    @property
+    def hash(self):
+        """
+        Getter for the hash property.
+        :return: Zobrist hash of the position
+        """
+        return self._hash
+
+    @property
+    def canonical_hash(self):
+        """
+        Getter for the canonical_hash property.
+        The position and its mirror image have the same canonical hash, because their evaluations are the same.
+        :return: The smaller of the Zobrist hashes of the position and of the mirrored position
+        """
+        return min(self._hash, self._mirror_hash)
+
+    @property
+    def computer_mask(self):
+        """
+        Getter for the computer_mask property.
+        :return: Bitboard of the computer tokens
+        """
+        return self._computer_mask
+
+    @property
+    def human_mask(self):
+        """
+        Getter for the human_mask property.
+        :return: Bitboard of the player tokens
+        """
+        return self._human_mask
+
+    @property
+    def rows(self):
+        """
+        Getter for the rows property.
+        :return: Number of rows
+        """
+        return self._rows
+
+    @property
+    def columns(self):
+        """
+        Getter for the columns property.
+        :return: Number of columns
+        """
+        return self._columns
+
+    @property
+    def win_length(self):
+        """
+        Getter for the win_length property.
+        :return: Number of tokens in a line which win the game
+        """
+        return self._win_length
+
+    @property
+    def cells(self):
+        """
+        Getter for the cells property.
+        :return: Number of cells of the board
+        """
+        return self._rows * self._columns
+
+    @property
+    def column_height(self):
+        """
+        Getter for the column_height property.
+        :return: Number of bits reserved for one column
+        """
+        return self._column_height
+
     @property
     def board(self):
         """
         Getter for the board property.
+        It is built from the bitboards, so changing it doesn't change the board.
         :return: Board as 2D array
         """
-        return self._board
+        board = [[DEFAULT_VALUE for x in range(self._columns)] for y in range(self._rows)]
+        for column in range(self._columns):
+            for height in range(self._heights[column]):
+                bit = 1 << (column * self._column_height + height)
+                board[self._rows - 1 - height][column] = COMPUTER if self._computer_mask & bit else HUMAN
+        return board
@@ -1,13 +1,59 @@
 # constants
 BOARD_SIZE = 7
-MIN_COLUMN_SIZE = 0
-MAX_COLUMN_SIZE = 6
 DEFAULT_VALUE = '='
 COMPUTER = 'C'
 HUMAN = 'P'
 COMPUTER_WIN = 1
 PLAYER_WIN = -1
 TIE = 0
-DEFAULT_DEPTH = 5
+DEFAULT_DEPTH = 6
 FULL_COLUMN = '-'
 FORMATTING = "{:.3f}"
+ZOBRIST_SEED = 2019
+TABLE_SIZE = 1 << 18
+REPLACE_ALWAYS = 'always'
+REPLACE_DEPTH = 'depth'
+ENGINE_AVERAGE = 'average'
+ENGINE_ALPHABETA = 'alphabeta'
+DEFAULT_ENGINE = ENGINE_AVERAGE
+DEFAULT_ALPHABETA_DEPTH = 10
+POLL_INTERVAL = 1024
+TASK_TAG = 1
+RESULT_TAG = 2
+CANCEL_TAG = 3
+ABORTED = '#'
+WAIT_INTERVAL = 0.001
+BOARD_TAG = 4
+NO_COLUMN = -1
+STOP_TAG = 5
+BACKEND_MPI = 'mpi'
+BACKEND_LOCAL = 'local'
+DEFAULT_BACKEND = BACKEND_MPI
+ENGINE_BATCH = 'batch'
+BATCH_DEPTH = 4
+BOOK_MOVES = 3
+BENCHMARK_DEPTHS = [4, DEFAULT_DEPTH]
+BENCHMARK_REPEATS = 3
+BENCHMARK_TOLERANCE = 0.1
+ENGINE_HEURISTIC = 'heuristic'
+DEFAULT_HEURISTIC_DEPTH = 4
+TWO_WEIGHT = 2
+THREE_WEIGHT = 5
+CENTER_WEIGHT = 3
+HEURISTIC_SCALE = 100.0
+HEURISTIC_LIMIT = 0.9
+DEFAULT_ROWS = BOARD_SIZE
+DEFAULT_COLUMNS = BOARD_SIZE
+DEFAULT_WIN_LENGTH = 4
+WORD_BITS = 62
+DEFAULT_DIMENSIONS = (DEFAULT_ROWS, DEFAULT_COLUMNS, DEFAULT_WIN_LENGTH)
+PONDER_INTERVAL = 0.05
+BOUND_TAG = 6
+SLOT_SIZE = 4
+SOLVE_DEPTH = -1
+ENDGAME_CELLS = 16
+SERVER_INTERVAL = 0.005
+ANALYSIS_BATCH = 64
+SHARED_TABLE_SIZE = 1 << 20
+BOUNDED_COLUMN = '?'
+TAG_STRIDE = 8
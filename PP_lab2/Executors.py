@@ -0,0 +1,508 @@
+from Board import Board
+from Constants import *
+
+import Helper
+from Helper import WorkerMessage
+from Helper import MasterMessage
+from TranspositionTable import SharedTranspositionTable
+from TranspositionTable import TranspositionTable
+
+from multiprocessing import shared_memory
+import multiprocessing
+import numpy as np
+import queue
+import time
+
+
+def run_task(message, search_function, table, stop, bounds=None, endgame_table=None):
+    """
+    Evaluates one task on the worker side, and counts the work which has been done.
+    The endgame tasks are solved to the end of the game, whatever the engine of the worker is.
+    :param message: MasterMessage with the task
+    :param search_function: Search function, one of the Helper.ENGINES
+    :param table: TranspositionTable or SharedTranspositionTable of the worker
+    :param stop: Function which returns True if the task has been cancelled
+    :param bounds: Function which returns the tightened window of the task, or None if it has not changed, or None
+    :param endgame_table: TranspositionTable of the solved positions, or None
+    :return: WorkerMessage with the evaluation of the task, or ABORTED if the task has been cancelled
+             or its window has been closed
+    """
+    if stop():
+        return WorkerMessage(message.col1, ABORTED, message.task_id)
+    start = time.time()
+    depth = message.depth
+    if depth == SOLVE_DEPTH:
+        search_function = Helper.evaluate_endgame
+        table = endgame_table if endgame_table is not None else TranspositionTable()
+        # the solver counts the depth by the empty cells
+        depth = message.board.cells - message.board.moves - len(message.moves)
+    hits = table.hits
+    context = Helper.SearchContext(table, stop, window=message.window, bounds=bounds)
+    computer_mask = message.board.computer_mask
+    human_mask = message.board.human_mask
+    try:
+        res = Helper.evaluate_task(message.board, message.moves, message.depth, search_function, context)
+    except Helper.SearchAborted:
+        res = ABORTED
+        # the stopped search leaves its moves on the board, and the next task can be from the same round
+        message.board.set_position(computer_mask, human_mask)
+    # the moves of the task are the first plies, the search starts after them and reaches the leaves at the depth 0
+    ply = len(message.moves)
+    if context.lowest_depth is not None:
+        ply += depth - context.lowest_depth
+    return WorkerMessage(message.col1, res, message.task_id, context.nodes, context.cutoffs, table.hits - hits, ply,
+                         time.time() - start)
+
+
+def allocate_shared_table(communicator):
+    """
+    Allocates the transposition table which the ranks on the same machine share.
+    The allocation is collective, so the master calls it too, although it doesn't search.
+    The first rank of every machine allocates the memory and clears it, the other ranks map it.
+    :param communicator: MPI communicator
+    :return: Tuple (MPI window of the memory, SharedTranspositionTable)
+    """
+    from mpi4py import MPI
+
+    node = communicator.Split_type(MPI.COMM_TYPE_SHARED)
+    size = SharedTranspositionTable.buffer_size(SHARED_TABLE_SIZE) if node.rank == 0 else 0
+    window = MPI.Win.Allocate_shared(size, 1, comm=node)
+    buffer, _ = window.Shared_query(0)
+    table = SharedTranspositionTable(buffer, SHARED_TABLE_SIZE)
+    if node.rank == 0:
+        table.clear()
+    # no rank uses the table before it is cleared
+    node.Barrier()
+    node.Free()
+    return window, table
+
+
+def free_shared_table(window, table):
+    """
+    Releases the shared transposition table. All ranks of the machine call it, because the release is collective.
+    :param window: MPI window of the memory
+    :param table: SharedTranspositionTable
+    """
+    table.release()
+    window.Free()
+
+
+class MPIExecutor:
+    """
+    Class MPIExecutor runs the tasks on the MPI worker ranks.
+    The master is the rank 0, and all other ranks run the function 'mpi_worker'.
+    A rank can have several slots, every one gets its own task: the messages of the slot have their tags
+    moved by TAG_STRIDE for every slot, and the slot 0 has the usual tags.
+    """
+    def __init__(self, communicator, shared_table=False, slots=None):
+        """
+        Initialization method.
+        :param communicator: MPI communicator
+        :param shared_table: True if the workers on the same machine share the transposition table,
+                             the workers have to be started with the same setting
+        :param slots: List of the numbers of the slots by the rank, or None for one slot on every worker rank
+        """
+        from mpi4py import MPI
+
+        self._mpi = MPI
+        self._communicator = communicator
+        if slots is None:
+            slots = [0] + [1] * (communicator.size - 1)
+        # the rank and the slot by the worker, the worker of the rank with one slot is the rank itself
+        ranks = [(rank, slot) for rank in range(1, communicator.size) for slot in range(slots[rank])]
+        if len(ranks) == communicator.size - 1:
+            self._addresses = {rank: (rank, slot) for rank, slot in ranks}
+        else:
+            self._addresses = {worker: address for worker, address in enumerate(ranks, 1)}
+        self._workers = {address: worker for worker, address in self._addresses.items()}
+        self._status = MPI.Status()
+        self._result_buffer = np.empty(WorkerMessage.SIZE, dtype=np.float64)
+        # the receive of the next result is always posted, so the master only tests it while it watches the deadline;
+        # the master gets only the results, their tags tell the slot
+        self._result_request = communicator.Irecv(self._result_buffer, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG)
+        # the sends don't block, so the master can watch the deadline; the buffers are kept until they are sent
+        self._requests = []
+        # encoded boards of the running search rounds, by the round
+        self._boards = {}
+        # the round of the board which every worker has
+        self._informed = {}
+        # the master only takes part in the allocation of the table of its machine
+        self._shared_table = allocate_shared_table(communicator) if shared_table else None
+
+    @property
+    def workers(self):
+        """
+        Getter for the workers property.
+        :return: List of the worker identifiers
+        """
+        return list(self._addresses)
+
+    def _send(self, buffer, worker, tag):
+        """
+        Sends the buffer to the slot of the worker without blocking, the buffer is kept until it is sent.
+        :param buffer: Array with the message
+        :param worker: Identifier of the worker
+        :param tag: Tag of the message for the slot 0
+        """
+        rank, slot = self._addresses[worker]
+        self._requests.append((self._communicator.Isend(buffer, dest=rank, tag=tag + TAG_STRIDE * slot), buffer))
+
+    def start_round(self, board, task_id):
+        """
+        Prepares the board for a new search round. Several rounds can run at the same time.
+        :param board: The game board
+        :param task_id: Identifier of the search round
+        """
+        self._boards[task_id] = Helper.encode_board(board, task_id)
+
+    def submit(self, worker, message):
+        """
+        Sends the task to the worker.
+        :param worker: Identifier of the worker
+        :param message: MasterMessage with the task
+        """
+        # the board is sent when the worker gets a task of another round, the tasks carry only the moves
+        if self._informed.get(worker) != message.task_id:
+            self._send(self._boards[message.task_id], worker, BOARD_TAG)
+            self._informed[worker] = message.task_id
+        self._send(message.encode(), worker, TASK_TAG)
+
+    def bound(self, worker, message):
+        """
+        Sends the tightened window of the running task to the worker, the worker reads it between the nodes.
+        :param worker: Identifier of the worker
+        :param message: MasterMessage of the running task with the new window
+        """
+        self._send(message.encode(), worker, BOUND_TAG)
+
+    def cancel(self, workers, task_id):
+        """
+        Tells the workers to cancel the tasks of the search round, the rank cancels them in all its slots.
+        :param workers: Identifiers of the workers
+        :param task_id: Identifier of the search round
+        """
+        for rank in sorted({self._addresses[worker][0] for worker in workers}):
+            buffer = np.array([task_id], dtype=np.int64)
+            self._requests.append((self._communicator.Isend(buffer, dest=rank, tag=CANCEL_TAG), buffer))
+
+    def receive(self, timeout=None):
+        """
+        Waits for the next result.
+        :param timeout: Maximum waiting time in seconds, or None to wait until the result arrives
+        :return: Tuple (worker, WorkerMessage), or None if the timeout has passed
+        """
+        if timeout is None:
+            self._result_request.Wait(self._status)
+        else:
+            end = time.time() + timeout
+            while not self._result_request.Test(self._status):
+                if time.time() > end:
+                    return None
+                time.sleep(WAIT_INTERVAL)
+
+        worker = self._workers[self._status.Get_source(), (self._status.Get_tag() - RESULT_TAG) // TAG_STRIDE]
+        result = worker, WorkerMessage.decode(self._result_buffer)
+        self._result_request = self._communicator.Irecv(self._result_buffer, source=self._mpi.ANY_SOURCE,
+                                                        tag=self._mpi.ANY_TAG)
+        return result
+
+    def finish_round(self, task_id):
+        """
+        Forgets the board of the finished search round, and the sends which are done.
+        The identifier can be used again, the next round with it sends its board again.
+        :param task_id: Identifier of the search round
+        """
+        del self._boards[task_id]
+        self._informed = {worker: informed for worker, informed in self._informed.items() if informed != task_id}
+        if self._requests:
+            done = self._mpi.Request.Testsome([request for request, buffer in self._requests]) or []
+            done = set(done)
+            self._requests = [pair for index, pair in enumerate(self._requests) if index not in done]
+
+    def close(self):
+        """
+        Stops the workers.
+        """
+        self._mpi.Request.waitall([request for request, buffer in self._requests])
+        self._requests = []
+        self._result_request.Cancel()
+        self._result_request.Wait()
+        for rank in sorted({rank for rank, slot in self._addresses.values()}):
+            self._communicator.Send(np.empty(0, dtype=np.int64), dest=rank, tag=STOP_TAG)
+        if self._shared_table is not None:
+            free_shared_table(*self._shared_table)
+            self._shared_table = None
+
+
+def receive_cancels(communicator, cancelled):
+    """
+    Receives all the cancel messages which are waiting.
+    :param communicator: MPI communicator
+    :param cancelled: Set of the identifiers of the cancelled search rounds, the new ones are added
+    """
+    buffer = np.empty(1, dtype=np.int64)
+    while communicator.Iprobe(source=0, tag=CANCEL_TAG):
+        communicator.Recv(buffer, source=0, tag=CANCEL_TAG)
+        cancelled.add(int(buffer[0]))
+
+
+def receive_bounds(communicator, message):
+    """
+    Receives all the windows which are waiting, the windows of the other tasks are dropped.
+    :param communicator: MPI communicator
+    :param message: MasterMessage of the running task
+    :return: The last window of the running task, or None if there is none
+    """
+    buffer = np.empty(MasterMessage.SIZE, dtype=np.int64)
+    window = None
+    while communicator.Iprobe(source=0, tag=BOUND_TAG):
+        communicator.Recv(buffer, source=0, tag=BOUND_TAG)
+        update = MasterMessage.decode(buffer, message.board)
+        if update.task_id == message.task_id and update.moves == message.moves:
+            window = update.window
+    return window
+
+
+def mpi_worker(communicator, engine, dimensions=DEFAULT_DIMENSIONS, shared_table=False):
+    """
+    The MPI worker evaluates the tasks from the master until the master stops it.
+    :param communicator: MPI communicator
+    :param engine: Name of the engine
+    :param dimensions: Tuple (rows, columns, win length) of the board
+    :param shared_table: True if the workers on the same machine share the transposition table
+    """
+    from mpi4py import MPI
+
+    # evaluated positions are kept for the whole game, the solved ones have their own table
+    window = None
+    if shared_table:
+        window, table = allocate_shared_table(communicator)
+    else:
+        table = TranspositionTable()
+    endgame_table = TranspositionTable()
+    search_function = Helper.ENGINES[engine]
+    # identifiers of the cancelled search rounds, the rounds of several games can run at the same time
+    cancelled = set()
+    status = MPI.Status()
+    # board of the search round of the last task
+    board = Board(*dimensions)
+    board_buffer = np.empty(Helper.board_buffer_size(board), dtype=np.int64)
+    task_buffer = np.empty(MasterMessage.SIZE, dtype=np.int64)
+
+    while True:
+        communicator.Probe(source=0, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == STOP_TAG:
+            communicator.Recv(np.empty(0, dtype=np.int64), source=0, tag=STOP_TAG)
+            if window is not None:
+                free_shared_table(window, table)
+            return
+        if status.Get_tag() == CANCEL_TAG:
+            receive_cancels(communicator, cancelled)
+            continue
+        if status.Get_tag() == BOARD_TAG:
+            communicator.Recv(board_buffer, source=0, tag=BOARD_TAG)
+            # the round of the board has started, so its identifier is not the one of a cancelled round
+            cancelled.discard(Helper.decode_board(board_buffer, board))
+            continue
+        if status.Get_tag() == BOUND_TAG:
+            # the window of a task which is already finished
+            communicator.Recv(task_buffer, source=0, tag=BOUND_TAG)
+            continue
+
+        # get the MasterMessage
+        communicator.Recv(task_buffer, source=0, tag=TASK_TAG)
+        message = MasterMessage.decode(task_buffer, board)
+
+        def stop(task_id=message.task_id):
+            receive_cancels(communicator, cancelled)
+            return task_id in cancelled
+
+        def bounds(task=message):
+            return receive_bounds(communicator, task)
+
+        # send the WorkerMessage
+        communicator.Send(run_task(message, search_function, table, stop, bounds, endgame_table).encode(), dest=0, tag=RESULT_TAG)
+
+
+class LocalExecutor:
+    """
+    Class LocalExecutor runs the tasks on the worker processes of this machine, without MPI.
+    The queues carry the same messages as the MPI executor sends, and the cancels and the windows are written
+    into a shared memory segment, which the running tasks check without any message.
+    The transposition table can be in another segment, so the workers reuse the positions evaluated by each other.
+    """
+    def __init__(self, processes, engine, dimensions=DEFAULT_DIMENSIONS, shared_table=False):
+        """
+        Initialization method.
+        :param processes: Number of the worker processes
+        :param engine: Name of the engine
+        :param dimensions: Tuple (rows, columns, win length) of the board
+        :param shared_table: True if the workers share the transposition table
+        """
+        self._segment = shared_memory.SharedMemory(create=True, size=processes * SLOT_SIZE * 8)
+        # the slot of every worker: the cancelled search round, and the search round of the window and the window
+        self._slots = np.ndarray((processes, SLOT_SIZE), dtype=np.int64, buffer=self._segment.buf)
+        self._slots[:] = -1
+        # the new segment is filled with zeros, which is the empty table
+        self._table_segment = None
+        table_name = None
+        if shared_table:
+            self._table_segment = shared_memory.SharedMemory(
+                create=True, size=SharedTranspositionTable.buffer_size(SHARED_TABLE_SIZE))
+            table_name = self._table_segment.name
+        self._results = multiprocessing.Queue()
+        self._tasks = []
+        self._processes = []
+        self._boards = {}
+        self._informed = {}
+
+        for worker in range(processes):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(target=local_worker,
+                                              args=(worker, tasks, self._results, self._segment.name, engine,
+                                                    dimensions, table_name),
+                                              daemon=True)
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+
+    @property
+    def workers(self):
+        """
+        Getter for the workers property.
+        :return: List of the worker identifiers
+        """
+        return list(range(len(self._processes)))
+
+    def start_round(self, board, task_id):
+        """
+        Prepares the board for a new search round. Several rounds can run at the same time.
+        :param board: The game board
+        :param task_id: Identifier of the search round
+        """
+        self._boards[task_id] = Helper.encode_board(board, task_id)
+
+    def submit(self, worker, message):
+        """
+        Sends the task to the worker.
+        :param worker: Identifier of the worker
+        :param message: MasterMessage with the task
+        """
+        # the board is sent when the worker gets a task of another round, the tasks carry only the moves
+        if self._informed.get(worker) != message.task_id:
+            self._tasks[worker].put((BOARD_TAG, self._boards[message.task_id]))
+            self._informed[worker] = message.task_id
+            # the worker is idle, so the cancel of its last round is not needed any more
+            self._slots[worker, 0] = -1
+        # the window of the previous task must not be taken for this one
+        self._slots[worker, 1] = -1
+        self._tasks[worker].put((TASK_TAG, message.encode()))
+
+    def bound(self, worker, message):
+        """
+        Writes the tightened window of the running task, the worker reads it between the nodes.
+        :param worker: Identifier of the worker
+        :param message: MasterMessage of the running task with the new window
+        """
+        # the window is written before the search round, so the worker never reads the round without its window
+        self._slots[worker, 2:] = message.window
+        self._slots[worker, 1] = message.task_id
+
+    def cancel(self, workers, task_id):
+        """
+        Tells the workers to cancel the tasks of the search round.
+        Every worker has one task at a time, so only the round of that task is written.
+        :param workers: Identifiers of the workers
+        :param task_id: Identifier of the search round
+        """
+        for worker in workers:
+            self._slots[worker, 0] = task_id
+
+    def receive(self, timeout=None):
+        """
+        Waits for the next result.
+        :param timeout: Maximum waiting time in seconds, or None to wait until the result arrives
+        :return: Tuple (worker, WorkerMessage), or None if the timeout has passed
+        """
+        try:
+            worker, buffer = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return worker, WorkerMessage.decode(buffer)
+
+    def finish_round(self, task_id):
+        """
+        Forgets the board of the finished search round, the queues deliver the tasks on their own.
+        The identifier can be used again, the next round with it sends its board again.
+        :param task_id: Identifier of the search round
+        """
+        del self._boards[task_id]
+        self._informed = {worker: informed for worker, informed in self._informed.items() if informed != task_id}
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory.
+        """
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join()
+        del self._slots
+        self._segment.close()
+        self._segment.unlink()
+        if self._table_segment is not None:
+            self._table_segment.close()
+            self._table_segment.unlink()
+
+
+def local_worker(worker, tasks, results, segment_name, engine, dimensions, table_name=None):
+    """
+    The local worker evaluates the tasks from the master until it gets None.
+    :param worker: Identifier of the worker
+    :param tasks: Queue of the tagged messages for this worker
+    :param results: Queue of the results for the master
+    :param segment_name: Name of the shared memory segment with the cancels and the windows
+    :param engine: Name of the engine
+    :param dimensions: Tuple (rows, columns, win length) of the board
+    :param table_name: Name of the shared memory segment with the transposition table, or None for a private table
+    """
+    segment = shared_memory.SharedMemory(name=segment_name)
+    # only the slot of this worker is read
+    slots = np.ndarray((worker + 1, SLOT_SIZE), dtype=np.int64, buffer=segment.buf)
+    # evaluated positions are kept for the whole game, the solved ones have their own table
+    table_segment = None
+    if table_name is not None:
+        table_segment = shared_memory.SharedMemory(name=table_name)
+        table = SharedTranspositionTable(table_segment.buf, SHARED_TABLE_SIZE)
+    else:
+        table = TranspositionTable()
+    endgame_table = TranspositionTable()
+    search_function = Helper.ENGINES[engine]
+    # board of the search round of the last task
+    board = Board(*dimensions)
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        tag, buffer = item
+        if tag == BOARD_TAG:
+            Helper.decode_board(buffer, board)
+            continue
+        message = MasterMessage.decode(buffer, board)
+
+        def stop(task_id=message.task_id):
+            return slots[worker, 0] == task_id
+
+        def bounds(task_id=message.task_id):
+            if slots[worker, 1] != task_id:
+                return None
+            return int(slots[worker, 2]), int(slots[worker, 3])
+
+        results.put((worker, run_task(message, search_function, table, stop, bounds, endgame_table).encode()))
+
+    del slots
+    segment.close()
+    if table_segment is not None:
+        table.release()
+        table_segment.close()
@@ -1,23 +1,38 @@
 from Constants import *
 from Board import Player
+from TranspositionTable import Bound
+import BatchEvaluation
+
+import numpy as np
 
 
 class MasterMessage:
     """
     Class MasterMessage represents a message which is sent from the master to the workers.
+    The board is not a part of the encoded message, it is sent once per search round.
     """
-    def __init__(self, board, column, column2, depth):
+    # length of the encoded message
+    SIZE = 7
+
+    def __init__(self, board, column, column2, depth, task_id=0, column3=None, window=None):
         """
         Initialization method.
         :param board: a game board
         :param column: Move from the pc
         :param column2: Move from the player
         :param depth: The depth of the search
+        :param task_id: Identifier of the search round the task belongs to
+        :param column3: Next move from the pc if the task is a part of a split task, or None
+        :param window: Tuple (lower, upper) of the alpha-beta window from the perspective of the computer,
+                       or None for the full window
         """
         self._board = board
         self._col1 = column
         self._col2 = column2
+        self._col3 = column3
         self._depth = depth
+        self._task_id = task_id
+        self._window = window if window is not None else (PLAYER_WIN, COMPUTER_WIN)
 
     @property
     def board(self):
@@ -43,6 +58,24 @@ class MasterMessage:
         """
         return self._col2
 
+    @property
+    def col3(self):
+        """
+        Property getter.
+        :return: The column of the next computers move, or None
+        """
+        return self._col3
+
+    @property
+    def moves(self):
+        """
+        Property getter.
+        :return: Columns of all moves of the task
+        """
+        if self._col3 is None:
+            return self._col1, self._col2
+        return self._col1, self._col2, self._col3
+
     @property
     def depth(self):
         """
@@ -51,19 +84,73 @@ class MasterMessage:
         """
         return self._depth
 
+    @property
+    def task_id(self):
+        """
+        Property getter.
+        :return: The identifier of the search round
+        """
+        return self._task_id
+
+    @property
+    def window(self):
+        """
+        Property getter.
+        :return: Tuple (lower, upper) of the alpha-beta window from the perspective of the computer
+        """
+        return self._window
+
+    def encode(self):
+        """
+        Encodes the message into an array which can be sent with the buffer-based MPI calls.
+        :return: Array [task_id, depth, col1, col2, col3, lower, upper]
+        """
+        column3 = NO_COLUMN if self._col3 is None else self._col3
+        return np.array([self._task_id, self._depth, self._col1, self._col2, column3] + list(self._window),
+                        dtype=np.int64)
+
+    @staticmethod
+    def decode(buffer, board):
+        """
+        Decodes the message from the array.
+        :param buffer: Array made by the method 'encode'
+        :param board: The board of the search round
+        :return: MasterMessage
+        """
+        task_id, depth, column, column2, column3, lower, upper = (int(value) for value in buffer)
+        return MasterMessage(board, column, column2, depth, task_id, None if column3 == NO_COLUMN else column3,
+                             (lower, upper))
+
 
 class WorkerMessage:
     """
     Class WorkerMessage represents a message which is sent from the workers to the master.
     """
-    def __init__(self, column, evaluation):
+    # length of the encoded message
+    SIZE = 9
+    # evaluations which are not numbers are encoded by these codes
+    CODES = {FULL_COLUMN: 1, ABORTED: 2}
+
+    def __init__(self, column, evaluation, task_id=0, nodes=0, cutoffs=0, hits=0, ply=0, duration=0.0):
         """
         Initialization method.
         :param column: Column for which worker calculated the evaluation
         :param evaluation: Evaluation for the column
+        :param task_id: Identifier of the search round the task belongs to
+        :param nodes: Number of the nodes the worker visited for the task
+        :param cutoffs: Number of the searches of the moves which were cut off
+        :param hits: Number of the positions found in the transposition table
+        :param ply: The deepest ply of the task which was searched, counted from the position of the round
+        :param duration: Time in seconds the worker spent on the task
         """
         self._col = column
         self._eval = evaluation
+        self._task_id = task_id
+        self._nodes = nodes
+        self._cutoffs = cutoffs
+        self._hits = hits
+        self._ply = ply
+        self._duration = duration
 
     @property
     def col(self):
@@ -81,172 +168,342 @@ class WorkerMessage:
         """
         return self._eval
 
+    @property
+    def task_id(self):
+        """
+        Property getter.
+        :return: The identifier of the search round
+        """
+        return self._task_id
+
+    @property
+    def nodes(self):
+        """
+        Property getter.
+        :return: Number of the visited nodes
+        """
+        return self._nodes
 
-def is_game_finished(board, last_move_column):
+    @property
+    def cutoffs(self):
+        """
+        Property getter.
+        :return: Number of the cutoffs
+        """
+        return self._cutoffs
+
+    @property
+    def hits(self):
+        """
+        Property getter.
+        :return: Number of the transposition table hits
+        """
+        return self._hits
+
+    @property
+    def ply(self):
+        """
+        Property getter.
+        :return: The deepest searched ply
+        """
+        return self._ply
+
+    @property
+    def duration(self):
+        """
+        Property getter.
+        :return: Time in seconds the worker spent on the task
+        """
+        return self._duration
+
+    def encode(self):
+        """
+        Encodes the message into an array which can be sent with the buffer-based MPI calls.
+        :return: Array [task_id, col, code, eval, nodes, cutoffs, hits, ply, duration],
+                 where code is 0 if the evaluation is a number
+        """
+        counters = [self._nodes, self._cutoffs, self._hits, self._ply, self._duration]
+        if self._eval in WorkerMessage.CODES:
+            return np.array([self._task_id, self._col, WorkerMessage.CODES[self._eval], 0] + counters,
+                            dtype=np.float64)
+        return np.array([self._task_id, self._col, 0, self._eval] + counters, dtype=np.float64)
+
+    @staticmethod
+    def decode(buffer):
+        """
+        Decodes the message from the array.
+        :param buffer: Array made by the method 'encode'
+        :return: WorkerMessage
+        """
+        task_id, column, code, evaluation, nodes, cutoffs, hits, ply, duration = buffer
+        if code != 0:
+            evaluation = next(value for value, value_code in WorkerMessage.CODES.items() if value_code == code)
+        else:
+            evaluation = float(evaluation)
+        return WorkerMessage(int(column), evaluation, int(task_id), int(nodes), int(cutoffs), int(hits), int(ply),
+                             float(duration))
+
+
+def mask_words(board):
     """
-    Method which checks if the game is finished.
-    :param board: Current board state
-    :param last_move_column: Column where the last token has been put
-    :return: True if game is finished, False otherwise
+    Number of the array items which hold one bitboard. Every item gets WORD_BITS bits of the bitboard,
+    so the bitboards of the large boards fit into the int64 arrays.
+    :param board: The game board
+    :return: Number of the items
     """
-    if board.last_player == Player.HUMAN:
-        token = HUMAN
-    else:
-        token = COMPUTER
+    return -(-board.columns * board.column_height // WORD_BITS)
 
-    # check if win is vertical
-    is_vertical = check_vertically(board, last_move_column, token)
-    # check if win is horizontal
-    is_horizontal = check_horizontally(board, last_move_column, token)
-    # check if win is on the left diagonal
-    is_left_diagonal = check_left_diagonal(board, last_move_column, token)
-    # check if win is on the right diagonal
-    is_right_diagonal = check_right_diagonal(board, last_move_column, token)
 
-    return is_vertical or is_horizontal or is_left_diagonal or is_right_diagonal
+def board_buffer_size(board):
+    """
+    Length of the array made by the function 'encode_board'.
+    :param board: The game board
+    :return: Length of the array
+    """
+    return 1 + 2 * mask_words(board)
 
 
-def check_vertically(board, last_move_column, token):
+def split_mask(mask, words):
     """
-    Check if four tokens are aligned vertically.
-    :param board: Board
-    :param last_move_column: Column where the last token has been put
-    :param token: From computer or human
-    :return: True if there are four, False otherwise
+    Splits the bitboard into the array items, the lowest bits first.
+    :param mask: Bitboard
+    :param words: Number of the items
+    :return: List of the items
     """
-    start_row = find_row(board, last_move_column)
-    counter = 0
+    word_mask = (1 << WORD_BITS) - 1
+    return [(mask >> (word * WORD_BITS)) & word_mask for word in range(words)]
 
-    for row in range(start_row, BOARD_SIZE):
-        if board.board[row][last_move_column] == token:
-            counter += 1
-        else:
-            break
 
-    return counter == 4
+def join_mask(words):
+    """
+    Joins the array items made by the function 'split_mask' into the bitboard.
+    :param words: Items of the array
+    :return: Bitboard
+    """
+    mask = 0
+    for word, value in enumerate(words):
+        mask |= int(value) << (word * WORD_BITS)
+    return mask
 
 
-def check_horizontally(board, last_move_column, token):
+def encode_board(board, task_id):
     """
-    Check if four tokens are aligned horizontally.
-    :param board: Board
-    :param last_move_column: Column where the last token has been put
-    :param token: From computer or human
-    :return: True if there are four, False otherwise
+    Encodes the board into an array which can be sent with the buffer-based MPI calls.
+    :param board: The game board
+    :param task_id: Identifier of the search round
+    :return: Array [task_id, computer_mask words, human_mask words]
     """
-    start_row = find_row(board, last_move_column)
-    counter = 0
+    words = mask_words(board)
+    return np.array([task_id] + split_mask(board.computer_mask, words) + split_mask(board.human_mask, words),
+                    dtype=np.int64)
 
-    # check right
-    for col in range(last_move_column, BOARD_SIZE):
-        if board.board[start_row][col] == token:
-            counter += 1
-        else:
-            break
 
-    if counter == 4:
-        return True
+def decode_board(buffer, board):
+    """
+    Decodes the board from the array.
+    :param buffer: Array made by the function 'encode_board'
+    :param board: Board which gets the decoded position
+    :return: Identifier of the search round
+    """
+    words = (len(buffer) - 1) // 2
+    board.set_position(join_mask(buffer[1:1 + words]), join_mask(buffer[1 + words:]))
+    return int(buffer[0])
 
-    # check left
-    for col in range(last_move_column+1)[::-1]:
-        if col == last_move_column:
-            continue
-        if board.board[start_row][col] == token:
-            counter += 1
-        else:
-            break
 
-    return counter == 4
+class SearchAborted(Exception):
+    """
+    Exception which is raised when the search has been cancelled.
+    """
+    pass
 
 
-def check_left_diagonal(board, last_move_column, token):
+class SearchContext:
     """
-    Check if four tokens are aligned diagonally.
-    :param board: Board
-    :param last_move_column: Column where the last token has been put
-    :param token: From computer or human
-    :return: True if there are four, False otherwise
+    Class SearchContext holds the state shared by all nodes of one search.
+    Every few nodes it asks the 'stop' function if the search should be cancelled,
+    and the 'bounds' function if the window of the alpha-beta search has been tightened.
     """
-    start_row = find_row(board, last_move_column)
-    counter = 0
-    temp = 0
+    def __init__(self, table=None, stop=None, interval=POLL_INTERVAL, batch_depth=0, heuristic=False, window=None,
+                 bounds=None):
+        """
+        Initialization method.
+        :param table: TranspositionTable with the already evaluated positions, or None
+        :param stop: Function which returns True if the search should be cancelled, or None
+        :param interval: Number of nodes between two calls of the 'stop' function
+        :param batch_depth: Remaining depth at which the averaging search evaluates the rest at once with NumPy,
+                            0 to always use the recursion
+        :param heuristic: True if the averaging search scores the positions at the end of the search
+                          by the static evaluation, False if they are ties
+        :param window: Tuple (lower, upper) of the alpha-beta window from the perspective of the computer,
+                       or None for the full window
+        :param bounds: Function which returns the tightened window, or None if it has not changed, or None
+        """
+        self._table = table
+        self._stop = stop
+        self._interval = interval
+        self._batch_depth = batch_depth
+        self._heuristic = heuristic
+        self._window = window if window is not None else (PLAYER_WIN, COMPUTER_WIN)
+        self._bounds = bounds
+        self._nodes = 0
+        self._cutoffs = 0
+        # the smallest remaining depth of the visited nodes and the leaves
+        self._lowest_depth = None
+        self._next_poll = interval
 
-    # check right
-    for row in range(start_row, BOARD_SIZE):
-        if last_move_column + temp <= MAX_COLUMN_SIZE and board.board[row][last_move_column + temp] == token:
-            counter += 1
-        else:
-            break
-        temp += 1
+    def visit(self, count=1, depth=None):
+        """
+        Counts the visited nodes.
+        :param count: Number of the visited nodes
+        :param depth: Remaining depth of the search at the visited nodes, or None
+        :raises SearchAborted: if the search has been cancelled, or its window has been closed
+        """
+        self._nodes += count
+        if depth is not None and (self._lowest_depth is None or depth < self._lowest_depth):
+            self._lowest_depth = depth
+        if self._nodes < self._next_poll:
+            return
+        self._next_poll = self._nodes + self._interval
+        if self._stop is not None and self._stop():
+            raise SearchAborted()
+        window = self._bounds() if self._bounds is not None else None
+        if window is not None:
+            self._window = (max(self._window[0], window[0]), min(self._window[1], window[1]))
+            # the result of the search can't change the evaluation of the round any more
+            if self._window[0] >= self._window[1]:
+                raise SearchAborted()
 
-    if counter == 4:
-        return True
+    def leaf(self):
+        """
+        Records the leaf at the depth 0 for the reached depth, the leaf is not counted as a node.
+        """
+        self._lowest_depth = 0
 
-    temp = 0
+    @property
+    def table(self):
+        """
+        Property getter.
+        :return: The transposition table
+        """
+        return self._table
 
-    # check left
-    for row in range(start_row + 1)[::-1]:
-        if row == start_row:
-            temp += 1
-            continue
-        if last_move_column - temp >= MIN_COLUMN_SIZE and board.board[row][last_move_column - temp] == token:
-            counter += 1
-        else:
-            break
-        temp += 1
+    @property
+    def batch_depth(self):
+        """
+        Property getter.
+        :return: Remaining depth at which the batch evaluation starts
+        """
+        return self._batch_depth
 
-    return counter == 4
+    @batch_depth.setter
+    def batch_depth(self, batch_depth):
+        """
+        Property setter.
+        :param batch_depth: Remaining depth at which the batch evaluation starts
+        """
+        self._batch_depth = batch_depth
 
+    @property
+    def window(self):
+        """
+        Property getter.
+        :return: Tuple (lower, upper) of the alpha-beta window from the perspective of the computer
+        """
+        return self._window
 
-def check_right_diagonal(board, last_move_column, token):
-    """
-    Check if four tokens are aligned diagonally.
-    :param board: Board
-    :param last_move_column: Column where the last token has been put
-    :param token: From computer or human
-    :return: True if there are four, False otherwise
-    """
-    start_row = find_row(board, last_move_column)
-    counter = 0
-    temp = 0
+    @property
+    def heuristic(self):
+        """
+        Property getter.
+        :return: True if the static evaluation is used at the end of the search
+        """
+        return self._heuristic
 
-    # check right
-    for row in range(start_row, BOARD_SIZE):
-        if last_move_column - temp >= MIN_COLUMN_SIZE and board.board[row][last_move_column - temp] == token:
-            counter += 1
-        else:
-            break
-        temp += 1
+    @heuristic.setter
+    def heuristic(self, heuristic):
+        """
+        Property setter.
+        :param heuristic: True if the static evaluation is used at the end of the search
+        """
+        self._heuristic = heuristic
 
-    if counter == 4:
-        return True
+    def cutoff(self):
+        """
+        Counts the search of the moves which was cut off.
+        """
+        self._cutoffs += 1
 
-    temp = 0
+    @property
+    def nodes(self):
+        """
+        Property getter.
+        :return: Number of visited nodes
+        """
+        return self._nodes
 
-    # check left
-    for row in range(start_row + 1)[::-1]:
-        if row == start_row:
-            temp += 1
-            continue
-        if last_move_column + temp <= MAX_COLUMN_SIZE and board.board[row][last_move_column + temp] == token:
-            counter += 1
-        else:
-            break
-        temp += 1
+    @property
+    def cutoffs(self):
+        """
+        Property getter.
+        :return: Number of the cutoffs
+        """
+        return self._cutoffs
 
-    return counter == 4
+    @property
+    def lowest_depth(self):
+        """
+        Property getter.
+        :return: The smallest remaining depth of the visited nodes and the leaves at the depth 0,
+                 or None if no node has been visited
+        """
+        return self._lowest_depth
 
 
-def find_row(board, column):
+def is_game_finished(board, last_move_column):
     """
-    Finds the row where the token is put.
-    :param board: Board
-    :param column: Column where the token is put
-    :return: Row of the current token
+    Method which checks if the game is finished.
+    Only the player who made the last move can have a winning line, so only that bitboard is tested.
+    :param board: Current board state
+    :param last_move_column: Column where the last token has been put
+    :return: True if game is finished, False otherwise
     """
-    for row in range(BOARD_SIZE):
-        if board.board[row][column] != DEFAULT_VALUE:
-            return row
+    mask = board.last_player_mask
+    height = board.column_height
+    length = board.win_length
+
+    # check if win is vertical
+    if is_aligned(mask, 1, length):
+        return True
+    # check if win is horizontal
+    if is_aligned(mask, height, length):
+        return True
+    # check if win is on the left diagonal
+    if is_aligned(mask, height + 1, length):
+        return True
+    # check if win is on the right diagonal
+    return is_aligned(mask, height - 1, length)
+
+
+def is_aligned(mask, shift, length=DEFAULT_WIN_LENGTH):
+    """
+    Check if the given number of tokens are aligned in the given direction.
+    Every step doubles the length of the lines which are kept, so only about log2(length) steps are needed.
+    :param mask: Bitboard of one player
+    :param shift: Distance between two neighbouring cells of the line in the bitboard
+    :param length: Number of tokens in the line
+    :return: True if there are enough, False otherwise
+    """
+    if length == DEFAULT_WIN_LENGTH:
+        pairs = mask & (mask >> shift)
+        return pairs & (pairs >> (2 * shift)) != 0
+    # bits where the lines of 'run' tokens start
+    run = 1
+    while run * 2 <= length:
+        mask &= mask >> (run * shift)
+        run *= 2
+    if run < length:
+        mask &= mask >> ((length - run) * shift)
+    return mask != 0
 
 
 def is_move_legal(board, column):
@@ -256,19 +513,19 @@ def is_move_legal(board, column):
     :param column: Column in which the token should be put
     :return: True if move is legal, False otherwise
     """
-    for row in range(BOARD_SIZE):
-        if board.board[row][column] == DEFAULT_VALUE:
-            return True
+    if column < 0 or column >= board.columns:
+        return False
 
-    return False
+    return not board.is_column_full(column)
 
 
-def evaluate(board, column, depth):
+def evaluate(board, column, depth, context=None):
     """
     Recursive function which tests out possible moves for the given board.
     :param board: The game board
     :param column: Column of the last move
     :param depth: Depth of the search
+    :param context: SearchContext of the search, or None
     """
 
     all_lose = True
@@ -282,61 +539,547 @@ def evaluate(board, column, depth):
             return PLAYER_WIN
 
     if depth == 0:
+        if context is None:
+            return TIE
+        context.leaf()
+        if context.heuristic:
+            return board.static_evaluation()
         return TIE
 
+    table = None
+    if context is not None:
+        context.visit(1, depth)
+        table = context.table
+
+    # the same position can be reached by a different order of moves, or be the mirror image of another one
+    key = board.canonical_hash
+    if table is not None:
+        entry = table.lookup(key, depth, exact=True)
+        if entry is not None:
+            return entry[0]
+
     # next level
-    depth -= 1
+    score = None
     total = 0
     moves = 0
 
-    for col in range(BOARD_SIZE):
+    # close to the end of the search, the rest of the tree is evaluated at once
+    if context is not None and depth <= context.batch_depth:
+        score, nodes = BatchEvaluation.evaluate_frontier(board, depth)
+        # the frontier reaches the leaves at the depth 0
+        context.visit(nodes, 0)
+
+    for col in range(board.columns if score is None else 0):
         if is_move_legal(board, col):
             moves = moves + 1
             board.make_a_move(col)
-            result = evaluate(board, col, depth)
+            result = evaluate(board, col, depth - 1, context)
             board.undo_last_move(col)
             if result > -1:
                 all_lose = False
             if result != 1:
                 all_win = False
             if result == 1 and board.last_player == Player.HUMAN:
-                return COMPUTER_WIN
+                score = COMPUTER_WIN
+                if context is not None:
+                    context.cutoff()
+                break
             if result == -1 and board.last_player == Player.COMPUTER:
-                return PLAYER_WIN
+                score = PLAYER_WIN
+                if context is not None:
+                    context.cutoff()
+                break
             total = total + result
 
-    if all_win:
-        return COMPUTER_WIN
+    if score is None:
+        # the board is full
+        if moves == 0:
+            score = TIE
+        elif all_win:
+            score = COMPUTER_WIN
+        elif all_lose:
+            score = PLAYER_WIN
+        else:
+            score = total/moves
+
+    if table is not None:
+        table.store(key, score, depth, Bound.EXACT)
+
+    return score
+
+
+def column_order(columns):
+    """
+    Order in which the columns are searched, the center columns first.
+    Central moves are usually the best ones, so the alpha-beta search can cut off more.
+    :param columns: Number of columns
+    :return: List of the columns
+    """
+    center = (columns - 1) / 2
+    return sorted(range(columns), key=lambda col: abs(col - center))
+
+
+# orders of the columns by the number of columns
+MOVE_ORDERS = {}
+
+
+def move_order(columns):
+    """
+    Order in which the columns are searched, it is made once for every number of columns.
+    :param columns: Number of columns
+    :return: List of the columns, the center columns first
+    """
+    if columns not in MOVE_ORDERS:
+        MOVE_ORDERS[columns] = column_order(columns)
+    return MOVE_ORDERS[columns]
+
+
+def negamax(board, depth, alpha, beta, context=None):
+    """
+    Recursive alpha-beta search in the negamax form.
+    The score is given from the perspective of the player whose move it is.
+    :param board: The game board
+    :param depth: Depth of the search
+    :param alpha: Lower bound of the search window
+    :param beta: Upper bound of the search window
+    :param context: SearchContext of the search, or None
+    :return: 1 if the player on the move wins, -1 if that player loses, 0 otherwise
+    """
+    if depth == 0:
+        if context is not None:
+            context.leaf()
+        return TIE
+
+    table = None
+    if context is not None:
+        context.visit(1, depth)
+        table = context.table
+
+    key = board.canonical_hash
+    original_alpha = alpha
+    if table is not None:
+        entry = table.lookup(key, depth)
+        if entry is not None:
+            score, bound = entry
+            if bound == Bound.EXACT:
+                return score
+            if bound == Bound.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+    best = None
+    for col in move_order(board.columns):
+        if is_move_legal(board, col):
+            board.make_a_move(col)
+            if is_game_finished(board, col):
+                score = COMPUTER_WIN
+            else:
+                score = -negamax(board, depth - 1, -beta, -alpha, context)
+            board.undo_last_move(col)
+            if best is None or score > best:
+                best = score
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                if context is not None:
+                    context.cutoff()
+                break
+
+    # the board is full
+    if best is None:
+        return TIE
+
+    if table is not None:
+        if best <= original_alpha:
+            bound = Bound.UPPER
+        elif best >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        table.store(key, best, depth, bound)
+
+    return best
+
+
+def search_root(board, depth, context):
+    """
+    Alpha-beta search of the position of the task. The window of the task can be tightened while it is searched,
+    so it is read again before every move. The position itself is not stored in the transposition table,
+    because its score depends on the window which is not known to the other tasks.
+    :param board: The game board
+    :param depth: Depth of the search
+    :param context: SearchContext of the search with the window of the task
+    :return: Score from the perspective of the player whose move it is
+    """
+    if depth == 0:
+        context.leaf()
+        return TIE
+    context.visit(1, depth)
+
+    # the window is given from the perspective of the computer
+    computer = board.last_player == Player.HUMAN
+    best = None
+    for col in move_order(board.columns):
+        lower, upper = context.window
+        alpha, beta = (lower, upper) if computer else (-upper, -lower)
+        if best is not None and best > alpha:
+            alpha = best
+        if alpha >= beta:
+            context.cutoff()
+            break
+        if is_move_legal(board, col):
+            board.make_a_move(col)
+            if is_game_finished(board, col):
+                score = COMPUTER_WIN
+            else:
+                score = -negamax(board, depth - 1, -beta, -alpha, context)
+            board.undo_last_move(col)
+            if best is None or score > best:
+                best = score
+
+    # the board is full
+    if best is None:
+        return TIE
+    return best
+
+
+def evaluate_alphabeta(board, column, depth, context=None):
+    """
+    Evaluates the given board with the alpha-beta search.
+    It can be used instead of the function 'evaluate'.
+    :param board: The game board
+    :param column: Column of the last move
+    :param depth: Depth of the search
+    :param context: SearchContext of the search, or None
+    :return: Evaluation from the perspective of the computer
+    """
+    if is_game_finished(board, column):
+        if board.last_player == Player.COMPUTER:
+            return COMPUTER_WIN
+        else:
+            return PLAYER_WIN
 
-    if all_lose:
+    if context is None:
+        score = negamax(board, depth, PLAYER_WIN, COMPUTER_WIN, context)
+    else:
+        score = search_root(board, depth, context)
+    if board.last_player == Player.HUMAN:
+        return score
+    return -score
+
+
+def evaluate_batch(board, column, depth, context=None):
+    """
+    Evaluates the given board with the averaging search, where the last BATCH_DEPTH moves
+    are evaluated at once with NumPy. The evaluation is the same as the one of the function 'evaluate'.
+    :param board: The game board
+    :param column: Column of the last move
+    :param depth: Depth of the search
+    :param context: SearchContext of the search, or None
+    :return: Evaluation from the perspective of the computer
+    """
+    if context is None:
+        context = SearchContext()
+    # the bitboards of the large boards don't fit into NumPy, so they are searched by the recursion only
+    context.batch_depth = BATCH_DEPTH if BatchEvaluation.fits(board) else 0
+    return evaluate(board, column, depth, context)
+
+
+def evaluate_heuristic(board, column, depth, context=None):
+    """
+    Evaluates the given board with the averaging search, where the positions at the end of the search
+    are scored by the static evaluation instead of being ties.
+    :param board: The game board
+    :param column: Column of the last move
+    :param depth: Depth of the search
+    :param context: SearchContext of the search, or None
+    :return: Evaluation from the perspective of the computer
+    """
+    if context is None:
+        context = SearchContext()
+    context.heuristic = True
+    return evaluate(board, column, depth, context)
+
+
+def solve_negamax(board, alpha, beta, context):
+    """
+    Null-window friendly alpha-beta search to the end of the game, in the negamax form.
+    The score counts the moves of the winner: the win with the next move of the player on the move scores
+    (empty cells + 1) // 2, every later move of the winner scores one less, the ties score 0,
+    and the losses are the negated wins of the opponent. The score doesn't depend on the moves before the position,
+    so it is stored in the transposition table and reused by all later searches.
+    :param board: The game board
+    :param alpha: Lower bound of the search window
+    :param beta: Upper bound of the search window
+    :param context: SearchContext of the search, its table keeps the solved positions
+    :return: Score from the perspective of the player whose move it is
+    """
+    empty = board.cells - board.moves
+    context.visit(1, empty)
+    # the board is full
+    if empty == 0:
+        return TIE
+
+    order = [col for col in move_order(board.columns) if is_move_legal(board, col)]
+    for col in order:
+        board.make_a_move(col)
+        won = is_game_finished(board, col)
+        board.undo_last_move(col)
+        if won:
+            return (empty + 1) // 2
+
+    # without the immediate win, the player on the move wins at best with the second move
+    best_possible = (empty - 1) // 2
+    if beta > best_possible:
+        beta = best_possible
+        if alpha >= beta:
+            return beta
+
+    table = context.table
+    key = board.canonical_hash
+    original_alpha = alpha
+    if table is not None:
+        entry = table.lookup(key, empty)
+        if entry is not None:
+            score, bound = entry
+            if bound == Bound.EXACT:
+                return score
+            if bound == Bound.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+    best = None
+    for col in order:
+        board.make_a_move(col)
+        score = -solve_negamax(board, -beta, -alpha, context)
+        board.undo_last_move(col)
+        if best is None or score > best:
+            best = score
+        if best > alpha:
+            alpha = best
+        if alpha >= beta:
+            context.cutoff()
+            break
+
+    if table is not None:
+        if best <= original_alpha:
+            bound = Bound.UPPER
+        elif best >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        table.store(key, best, empty, bound)
+
+    return best
+
+
+def solve(board, context):
+    """
+    Solves the position with the null-window searches, which halve the range of the possible scores every time.
+    :param board: The game board
+    :param context: SearchContext of the search
+    :return: Score of the function 'solve_negamax' from the perspective of the player whose move it is
+    """
+    empty = board.cells - board.moves
+    lower = -(empty // 2)
+    upper = (empty + 1) // 2
+    while lower < upper:
+        middle = lower + (upper - lower) // 2
+        # the scores near 0 are tested first, their searches are the cheapest ones
+        if middle <= 0 and lower // 2 < middle:
+            middle = lower // 2
+        elif middle >= 0 and upper // 2 > middle:
+            middle = upper // 2
+        score = solve_negamax(board, middle, middle + 1, context)
+        if score <= middle:
+            upper = score
+        else:
+            lower = score
+    return lower
+
+
+def evaluate_endgame(board, column, depth, context=None):
+    """
+    Solves the given board to the end of the game, whatever the depth is.
+    :param board: The game board
+    :param column: Column of the last move
+    :param depth: Depth of the search, it is not used
+    :param context: SearchContext of the search, or None
+    :return: Score of the function 'solve_negamax' from the perspective of the computer
+    """
+    if context is None:
+        context = SearchContext()
+    if is_game_finished(board, column):
+        # the last move has won the game
+        score = -((board.cells - board.moves + 2) // 2)
+    else:
+        score = solve(board, context)
+    if board.last_player == Player.HUMAN:
+        return score
+    return -score
+
+
+def solved_value(score, board):
+    """
+    Scales the score of the solved position from the move of the player on the board to the evaluation.
+    The win with the next move is 1, the loss with the next move of the opponent is -1,
+    and the later wins and losses are closer to 0, so the faster wins are preferred.
+    :param score: Score of the function 'solve_negamax' from the perspective of the computer
+    :param board: The game board, its position is the one where the search starts
+    :return: Evaluation from the perspective of the computer
+    """
+    empty = board.cells - board.moves
+    sign = 1 if board.last_player == Player.HUMAN else -1
+    score = sign * score
+    if score > 0:
+        return sign * score / ((empty + 1) // 2)
+    if score < 0:
+        return sign * score / (empty // 2)
+    return TIE
+
+
+# search functions by the name of the engine
+ENGINES = {
+    ENGINE_AVERAGE: evaluate,
+    ENGINE_ALPHABETA: evaluate_alphabeta,
+    ENGINE_BATCH: evaluate_batch,
+    ENGINE_HEURISTIC: evaluate_heuristic,
+}
+
+
+def evaluate_task(board, moves, depth, search=evaluate, context=None):
+    """
+    Evaluates one task: the given moves, starting with the move of the computer, followed by the search.
+    If the search is cancelled, the board is left with the moves of the unfinished search on it.
+    :param board: The game board
+    :param moves: Columns of the moves which are made before the search
+    :param depth: Depth of the search
+    :param search: Search function, one of the ENGINES, or None if only the moves should be checked
+    :param context: SearchContext of the search, or None
+    :return: Evaluation of the task, FULL_COLUMN if a move can't be made,
+             or None if the search is needed but not given
+    """
+    played = []
+    res = None
+
+    for column in moves:
+        # if the column is not full make a move, and check if the game can be finished
+        if not is_move_legal(board, column):
+            res = FULL_COLUMN
+            break
+        board.make_a_move(column)
+        played.append(column)
+        if is_game_finished(board, column):
+            res = COMPUTER_WIN if board.last_player == Player.COMPUTER else PLAYER_WIN
+            break
+
+    # if the game is not yet finished, evaluate the next move
+    if res is None and search is not None:
+        res = search(board, moves[-1], depth, context)
+
+    for column in reversed(played):
+        board.undo_last_move(column)
+
+    return res
+
+
+def reduce_evaluations(evaluations, last_player, engine=ENGINE_AVERAGE):
+    """
+    Combines the evaluations of the moves from one position the same way the search does.
+    It is used when the moves have been evaluated as separate tasks.
+    :param evaluations: Evaluations of the legal moves, ordered by the column
+    :param last_player: The player who made the last move before the evaluated moves
+    :param engine: Name of the engine which made the evaluations
+    :return: Evaluation of the position
+    """
+    # the board is full
+    if not evaluations:
+        return TIE
+
+    if engine == ENGINE_ALPHABETA:
+        if last_player == Player.HUMAN:
+            return max(evaluations)
+        return min(evaluations)
+
+    if last_player == Player.HUMAN and COMPUTER_WIN in evaluations:
+        return COMPUTER_WIN
+    if last_player == Player.COMPUTER and PLAYER_WIN in evaluations:
+        return PLAYER_WIN
+    if all(evaluation == COMPUTER_WIN for evaluation in evaluations):
+        return COMPUTER_WIN
+    if all(evaluation == PLAYER_WIN for evaluation in evaluations):
         return PLAYER_WIN
 
-    return total/moves
+    total = 0
+    for evaluation in evaluations:
+        total = total + evaluation
+    return total/len(evaluations)
 
 
-def get_max_evaluation(evaluate_results, board):
+def get_max_evaluation(evaluate_results, board, engine=ENGINE_AVERAGE):
     """
     Finds maximum evaluation amongst the all.
+    The averaging engine takes the average over the replies,
+    and the alpha-beta engine expects that the opponent will choose the best reply.
     :param board: The board
     :param evaluate_results: Dictionary of the evaluations by the column
+    :param engine: Name of the engine which made the evaluations
     :return: max evaluation
     """
-    results = [FULL_COLUMN]*7
+    results = [FULL_COLUMN]*board.columns
 
     for column, evaluations in evaluate_results.items():
-        temp = 0.0
-        cnt = 0
         # if the end of the board is reached, continue
         if FULL_COLUMN in evaluations and not is_move_legal(board, column):
             continue
-        else:
-            for evaluation in evaluations:
-                if evaluation != FULL_COLUMN:
-                    cnt += 1
-                    temp += evaluation
 
-            results[column] = temp / cnt
+        evaluations = [evaluation for evaluation in evaluations if evaluation != FULL_COLUMN]
+        # the move fills up the board
+        if not evaluations:
+            results[column] = TIE
+        elif engine == ENGINE_ALPHABETA:
+            # the replies are made by the player who made the last move
+            results[column] = min(evaluations) if board.last_player == Player.HUMAN else max(evaluations)
+        else:
+            results[column] = sum(evaluations) / len(evaluations)
 
     return results
 
 
+def preference_order(columns, engine=ENGINE_AVERAGE):
+    """
+    Order in which the columns with the same evaluation are preferred.
+    :param columns: Number of columns
+    :param engine: Name of the engine which made the evaluations
+    :return: List of the columns
+    """
+    return move_order(columns) if engine == ENGINE_ALPHABETA else list(range(columns))
+
+
+def get_best_column(results, engine=ENGINE_AVERAGE, player=Player.COMPUTER):
+    """
+    Finds the column with the best evaluation.
+    The alpha-beta engine gives the same score to many columns, so the center columns are preferred.
+    :param results: Evaluations by the column, the full and the bounded columns are skipped
+    :param engine: Name of the engine which made the evaluations
+    :param player: The player on the move, the evaluations are the best for the computer when they are high
+    :return: The best column, or -1 if all columns are full
+    """
+    order = preference_order(len(results), engine)
+    sign = 1 if player == Player.COMPUTER else -1
+    best_move = -2
+    best_col = -1
+
+    for index in order:
+        value = results[index]
+        if value != FULL_COLUMN and value != BOUNDED_COLUMN and sign * value > best_move:
+            best_move = sign * value
+            best_col = index
+
+    return best_col
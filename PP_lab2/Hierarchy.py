@@ -0,0 +1,369 @@
+from Board import Board
+from Constants import *
+
+import Executors
+import Helper
+from Helper import MasterMessage
+from Helper import WorkerMessage
+
+from collections import deque
+import numpy as np
+import time
+
+
+def split_nodes(communicator):
+    """
+    Splits the ranks by the machine for the two-level topology. The master and the first worker rank
+    of every machine form the communicator of the master, and the worker ranks of every machine
+    form the communicator of the machine, where the first one is the sub-master.
+    The sub-master takes one task of the master for every worker of its machine.
+    :param communicator: MPI communicator of all ranks, the master is the rank 0
+    :return: Tuple (communicator of the master and the sub-masters, or None for the other ranks,
+             communicator of the workers on the same machine, or None for the master,
+             list of the numbers of the slots by the rank of the sub-master for the master, or None for the others)
+    """
+    from mpi4py import MPI
+
+    node = communicator.Split_type(MPI.COMM_TYPE_SHARED, key=communicator.rank)
+    local = node.Split(MPI.UNDEFINED if communicator.rank == 0 else 0, communicator.rank)
+    node.Free()
+    leader = communicator.rank == 0 or local.rank == 0
+    # the master stays the rank 0 of its communicator
+    leaders = communicator.Split(0 if leader else MPI.UNDEFINED, communicator.rank)
+    slots = None
+    if leaders != MPI.COMM_NULL:
+        # the only rank of a machine searches one task itself
+        slots = leaders.gather(0 if communicator.rank == 0 else max(local.size - 1, 1), root=0)
+    return (leaders if leaders != MPI.COMM_NULL else None), (local if local != MPI.COMM_NULL else None), slots
+
+
+class SplitTask:
+    """
+    Class SplitTask is the task of the master on the machine. The task is split into the parts
+    for the next move, and the evaluations of the parts are combined the same way the master combines
+    the split tasks.
+    """
+    def __init__(self, message, engine):
+        """
+        Initialization method.
+        :param message: MasterMessage with the task
+        :param engine: Name of the engine
+        """
+        self._message = message
+        self._engine = engine
+        self._window = message.window
+        self._evaluations = {}
+        self._left = 0
+        self._aborted = False
+        self._counters = [0, 0, 0, 0]
+        self._start = time.time()
+
+    @property
+    def message(self):
+        """
+        Getter for the task of the master.
+        :return: MasterMessage with the task
+        """
+        return self._message
+
+    @property
+    def aborted(self):
+        """
+        Getter for the abort of the task.
+        :return: True if the window of the task has been closed, or the task has been cancelled
+        """
+        return self._aborted
+
+    @property
+    def finished(self):
+        """
+        Getter for the end of the task.
+        :return: True if all parts of the task are answered
+        """
+        return self._left == 0
+
+    def split(self):
+        """
+        Splits the task. The tasks of the solver and the tasks which are already split are sent whole.
+        :return: List of the columns of the next move of the parts, the column is None if the task is sent whole
+        """
+        message = self._message
+        board = message.board
+        parts = [None]
+        if len(message.moves) == 2 and message.depth > 0:
+            parts = []
+            for col3 in Helper.move_order(board.columns):
+                evaluation = Helper.evaluate_task(board, message.moves + (col3,), message.depth - 1, None)
+                if evaluation is None:
+                    parts.append(col3)
+                else:
+                    self._evaluations[col3] = evaluation
+        self._left = len(parts)
+        return parts
+
+    def part(self, col3):
+        """
+        Makes the message of the part of the task, with the current window.
+        :param col3: Column of the next move, or None if the task is sent whole
+        :return: MasterMessage of the part
+        """
+        message = self._message
+        if col3 is None:
+            return MasterMessage(message.board, message.col1, message.col2, message.depth, message.task_id,
+                                 message.col3, self._window)
+        return MasterMessage(message.board, message.col1, message.col2, message.depth - 1, message.task_id, col3,
+                             self._window)
+
+    def record(self, col3, evaluation):
+        """
+        Stores the result of the part.
+        :param col3: Column of the next move of the part
+        :param evaluation: WorkerMessage with the result
+        """
+        self._left -= 1
+        self._counters[0] += evaluation.nodes
+        self._counters[1] += evaluation.cutoffs
+        self._counters[2] += evaluation.hits
+        self._counters[3] = max(self._counters[3], evaluation.ply)
+        if evaluation.eval == ABORTED:
+            # the window of the task has been closed, or the task has been cancelled
+            self._aborted = True
+        else:
+            self._evaluations[col3] = evaluation.eval
+
+    def bound(self, window):
+        """
+        Tightens the window of the task, the closed window stops the task.
+        :param window: Tuple (lower, upper) from the perspective of the computer
+        """
+        self._window = window
+        if window[0] >= window[1]:
+            self._aborted = True
+
+    def abort(self, dropped=0):
+        """
+        Stops the task.
+        :param dropped: Number of the parts which are dropped before they are sent
+        """
+        self._aborted = True
+        self._left -= dropped
+
+    def result(self):
+        """
+        Combines the evaluations of the parts.
+        :return: WorkerMessage with the result of the task
+        """
+        message = self._message
+        if self._aborted:
+            evaluation = ABORTED
+        elif None in self._evaluations:
+            evaluation = self._evaluations[None]
+        else:
+            # the reply is made by the player who made the last move on the board
+            split = [self._evaluations[col3] for col3 in sorted(self._evaluations)]
+            split = [evaluation for evaluation in split if evaluation != FULL_COLUMN]
+            evaluation = Helper.reduce_evaluations(split, message.board.last_player, self._engine)
+        nodes, cutoffs, hits, ply = self._counters
+        return WorkerMessage(message.col1, evaluation, message.task_id, nodes, cutoffs, hits, ply,
+                             time.time() - self._start)
+
+
+class SubMaster:
+    """
+    Class SubMaster takes the tasks of the master for one machine, one task for every worker of the machine.
+    Every task is split into the parts for the next move, the parts of all tasks wait in one queue
+    and go to the idle workers of the machine, and their evaluations are combined, so the master gets
+    one result for the task. Every task comes in its own slot, where the sub-master talks to the master
+    the same way as the worker does, so the master runs the usual MPIExecutor over the slots.
+    """
+    def __init__(self, leaders, local, engine, dimensions=DEFAULT_DIMENSIONS, shared_table=False):
+        """
+        Initialization method.
+        :param leaders: MPI communicator of the master and the sub-masters
+        :param local: MPI communicator of the workers on this machine, the sub-master is its rank 0
+        :param engine: Name of the engine
+        :param dimensions: Tuple (rows, columns, win length) of the board
+        :param shared_table: True if the workers on the machine share the transposition table
+        """
+        from mpi4py import MPI
+
+        self._mpi = MPI
+        self._leaders = leaders
+        self._engine = engine
+        self._dimensions = dimensions
+        self._executor = Executors.MPIExecutor(local, shared_table)
+        self._idle = deque(self._executor.workers)
+        # identifiers of the cancelled search rounds of the master
+        self._cancelled = set()
+        # the board of every slot and its search round, and the boards of the search rounds of the workers
+        # of the machine, which get them with the same identifier; the board is None if it has to be sent again
+        self._boards = {}
+        self._slot_rounds = {}
+        self._round_boards = {}
+        self._board_buffer = np.empty(Helper.board_buffer_size(Board(*dimensions)), dtype=np.int64)
+        self._task_buffer = np.empty(MasterMessage.SIZE, dtype=np.int64)
+        # the task of every slot, the parts which are not sent, and the part by the worker
+        self._tasks = {}
+        self._pending = deque()
+        self._running = {}
+
+    def run(self):
+        """
+        Runs the tasks of the master until the master stops the sub-master.
+        The results of the workers are collected between the messages of the master.
+        """
+        status = self._mpi.Status()
+        while True:
+            if not self._tasks:
+                self._leaders.Probe(source=0, tag=self._mpi.ANY_TAG, status=status)
+            else:
+                received = self._executor.receive(WAIT_INTERVAL)
+                if received is not None:
+                    self._record(*received)
+                if not self._leaders.Iprobe(source=0, tag=self._mpi.ANY_TAG, status=status):
+                    continue
+
+            slot, tag = divmod(status.Get_tag(), TAG_STRIDE)
+            if tag == STOP_TAG:
+                self._leaders.Recv(np.empty(0, dtype=np.int64), source=0, tag=STOP_TAG)
+                self._executor.close()
+                return
+            if tag == CANCEL_TAG:
+                Executors.receive_cancels(self._leaders, self._cancelled)
+                for task_slot, task in list(self._tasks.items()):
+                    if task.message.task_id in self._cancelled and not task.aborted:
+                        self._cancel(task_slot)
+            elif tag == BOARD_TAG:
+                self._leaders.Recv(self._board_buffer, source=0, tag=status.Get_tag())
+                self._start_board(slot)
+            elif tag == BOUND_TAG:
+                self._leaders.Recv(self._task_buffer, source=0, tag=status.Get_tag())
+                update = MasterMessage.decode(self._task_buffer, self._boards[slot])
+                # the window of a task which is already finished is dropped
+                task = self._tasks.get(slot)
+                if task is not None and update.task_id == task.message.task_id and update.moves == task.message.moves:
+                    self._bound(slot, update.window)
+            else:
+                self._leaders.Recv(self._task_buffer, source=0, tag=status.Get_tag())
+                self._start_task(slot, MasterMessage.decode(self._task_buffer, self._boards[slot]))
+
+    def _start_board(self, slot):
+        """
+        Takes the board of the search round for the slot, the workers of the machine get the board
+        if they do not have it already.
+        :param slot: Slot of the board
+        """
+        board = self._boards.setdefault(slot, Board(*self._dimensions))
+        task_id = Helper.decode_board(self._board_buffer, board)
+        self._cancelled.discard(task_id)
+        encoded = self._board_buffer.tobytes()
+        if self._round_boards.get(task_id) != encoded:
+            # the board is sent to the workers again, and it clears their cancels of the identifier
+            if task_id in self._round_boards:
+                self._executor.finish_round(task_id)
+            self._executor.start_round(board, task_id)
+            self._round_boards[task_id] = encoded
+        previous = self._slot_rounds.get(slot)
+        self._slot_rounds[slot] = task_id
+        # the round which no slot uses any more is forgotten, its tasks are finished
+        if previous is not None and previous not in self._slot_rounds.values():
+            self._executor.finish_round(previous)
+            del self._round_boards[previous]
+
+    def _start_task(self, slot, message):
+        """
+        Splits the task of the master and queues the parts for the workers.
+        :param slot: Slot of the task
+        :param message: MasterMessage with the task
+        """
+        task = SplitTask(message, self._engine)
+        self._tasks[slot] = task
+        parts = task.split()
+        # the cancel of the round can come before its task
+        if message.task_id in self._cancelled:
+            task.abort(len(parts))
+        else:
+            self._pending.extend((slot, col3) for col3 in parts)
+        self._assign()
+
+    def _assign(self):
+        """
+        Gives the queued parts to the idle workers, and answers the master for the finished tasks.
+        """
+        while self._idle and self._pending:
+            worker = self._idle.popleft()
+            slot, col3 = self._pending.popleft()
+            self._running[worker] = slot, col3
+            self._executor.submit(worker, self._tasks[slot].part(col3))
+        for slot, task in list(self._tasks.items()):
+            if task.finished:
+                self._leaders.Send(task.result().encode(), dest=0, tag=RESULT_TAG + TAG_STRIDE * slot)
+                del self._tasks[slot]
+
+    def _drop(self, slot):
+        """
+        Removes the parts of the task from the queue and stops the task.
+        :param slot: Slot of the task
+        """
+        pending = len(self._pending)
+        self._pending = deque(part for part in self._pending if part[0] != slot)
+        self._tasks[slot].abort(pending - len(self._pending))
+
+    def _record(self, worker, evaluation):
+        """
+        Stores the result of the worker.
+        :param worker: Identifier of the worker
+        :param evaluation: WorkerMessage with the result
+        """
+        slot, col3 = self._running.pop(worker)
+        self._idle.append(worker)
+        task = self._tasks[slot]
+        task.record(col3, evaluation)
+        if task.aborted:
+            self._drop(slot)
+        self._assign()
+
+    def _bound(self, slot, window):
+        """
+        Passes the tightened window of the task to the workers, the closed window stops the task.
+        :param slot: Slot of the task
+        :param window: Tuple (lower, upper) from the perspective of the computer
+        """
+        task = self._tasks[slot]
+        task.bound(window)
+        if task.aborted:
+            self._drop(slot)
+        for worker, (task_slot, col3) in self._running.items():
+            if task_slot == slot:
+                self._executor.bound(worker, task.part(col3))
+        self._assign()
+
+    def _cancel(self, slot):
+        """
+        Cancels the task, the master gets the result when the workers return the running parts.
+        :param slot: Slot of the task
+        """
+        self._drop(slot)
+        task_id = self._tasks[slot].message.task_id
+        workers = [worker for worker, (task_slot, col3) in self._running.items() if task_slot == slot]
+        if workers:
+            self._executor.cancel(workers, task_id)
+            # the workers keep the cancel until they get the board of the round again
+            self._round_boards[task_id] = None
+        self._assign()
+
+
+def sub_master(leaders, local, engine, dimensions=DEFAULT_DIMENSIONS, shared_table=False):
+    """
+    The sub-master runs the tasks of the master on the workers of its machine until the master stops it.
+    The only rank of a machine searches the tasks itself.
+    :param leaders: MPI communicator of the master and the sub-masters
+    :param local: MPI communicator of the workers on this machine, the sub-master is its rank 0
+    :param engine: Name of the engine
+    :param dimensions: Tuple (rows, columns, win length) of the board
+    :param shared_table: True if the workers on the machine share the transposition table
+    """
+    if local.size == 1:
+        Executors.mpi_worker(leaders, engine, dimensions)
+        return
+    SubMaster(leaders, local, engine, dimensions, shared_table).run()
@@ -0,0 +1,116 @@
+import json
+import time
+
+# counters of the workers which are summed over the tasks
+COUNTERS = ['tasks', 'nodes', 'cutoffs', 'hits', 'busy']
+
+
+class SearchStatistics:
+    """
+    Class SearchStatistics collects the counters which the workers return with the results, by the worker.
+    The time is measured from the creation of the statistics, so one object is made for every move.
+    """
+    def __init__(self):
+        """
+        Initialization method.
+        """
+        self._start = time.time()
+        self._workers = {}
+        # time the master spent waiting for the results
+        self._wait = 0.0
+
+    def record(self, worker, evaluation):
+        """
+        Adds the counters of one task.
+        :param worker: Identifier of the worker
+        :param evaluation: WorkerMessage with the result and the counters
+        """
+        counters = self._workers.get(worker)
+        if counters is None:
+            counters = dict.fromkeys(COUNTERS, 0)
+            counters['ply'] = 0
+            self._workers[worker] = counters
+        counters['tasks'] += 1
+        counters['nodes'] += evaluation.nodes
+        counters['cutoffs'] += evaluation.cutoffs
+        counters['hits'] += evaluation.hits
+        counters['busy'] += evaluation.duration
+        counters['ply'] = max(counters['ply'], evaluation.ply)
+
+    def add_wait(self, duration):
+        """
+        Adds the time the master spent waiting for a result.
+        :param duration: Waiting time in seconds
+        """
+        self._wait += duration
+
+    @property
+    def nodes(self):
+        """
+        Getter for the nodes property.
+        :return: Number of the nodes visited by all workers
+        """
+        return sum(counters['nodes'] for counters in self._workers.values())
+
+    @property
+    def tasks(self):
+        """
+        Getter for the tasks property.
+        :return: Number of the tasks returned by all workers
+        """
+        return sum(counters['tasks'] for counters in self._workers.values())
+
+    def report(self, workers):
+        """
+        Summary of the statistics. The workers which got no task are idle all the time.
+        The load imbalance is the ratio of the longest and the average busy time of the workers, 1 is the best.
+        :param workers: List of the worker identifiers
+        :return: Dictionary with the totals and the counters by the worker
+        """
+        wall_time = time.time() - self._start
+        ranks = []
+        for worker in workers:
+            counters = dict(self._workers.get(worker, dict.fromkeys(COUNTERS + ['ply'], 0)))
+            counters['worker'] = worker
+            counters['idle'] = max(0.0, wall_time - counters['busy'])
+            counters['nodes_per_second'] = counters['nodes'] / counters['busy'] if counters['busy'] > 0 else 0.0
+            ranks.append(counters)
+
+        busy = [counters['busy'] for counters in ranks]
+        average = sum(busy) / len(busy) if busy else 0.0
+        return {
+            'wall_time': wall_time,
+            'wait': self._wait,
+            'tasks': self.tasks,
+            'nodes': self.nodes,
+            'nodes_per_second': self.nodes / wall_time if wall_time > 0 else 0.0,
+            'imbalance': max(busy) / average if average > 0 else 1.0,
+            'workers': ranks,
+        }
+
+
+def dump(path, record):
+    """
+    Appends the record to the file of JSON lines.
+    :param path: Path of the file
+    :param record: Dictionary which is written as one line
+    """
+    with open(path, 'a') as stats_file:
+        stats_file.write(json.dumps(record) + '\n')
+
+
+def format_report(report):
+    """
+    Formats the summary of the statistics for the output.
+    :param report: Dictionary made by the method 'SearchStatistics.report'
+    :return: Lines of the text, the totals first and then one line per worker
+    """
+    lines = ['{:.3f} s, {} nodes, {:.0f} nodes/s, waiting {:.3f} s, imbalance {:.3f}'.format(
+        report['wall_time'], report['nodes'], report['nodes_per_second'], report['wait'], report['imbalance'])]
+    for counters in report['workers']:
+        lines.append('  worker {}: {} tasks, {} nodes, {:.0f} nodes/s, {} cutoffs, {} hits, ply {}, '
+                     'busy {:.3f} s, idle {:.3f} s'.format(counters['worker'], counters['tasks'], counters['nodes'],
+                                                          counters['nodes_per_second'], counters['cutoffs'],
+                                                          counters['hits'], counters['ply'], counters['busy'],
+                                                          counters['idle']))
+    return lines
@@ -1,123 +1,319 @@
 from Board import Board
+from Board import Player
 from Constants import *
 
+import Analysis
+import Executors
 import Helper
-from Helper import WorkerMessage
-from Helper import MasterMessage
-
-from mpi4py import MPI
+import Hierarchy
+import Instrumentation
+from Instrumentation import SearchStatistics
+from OpeningBook import OpeningBook
+import Pondering
+import Scheduler
+import SelfPlay
+import Server
 
+import argparse
+import copy
+import itertools
+import os
+import queue
 import sys
+import threading
 import time
 
 
-if __name__ == "__main__":
+def parse_arguments():
     """
-    Main method which tests out the Connect4 game.
-    The game runs by entering 'mpiexec -n <processes_number> python Main.py' into the terminal.
+    Parses the command line arguments. Every process parses the same arguments.
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Connect4 game with the parallel search.')
+    parser.add_argument('--engine', choices=sorted(Helper.ENGINES), default=DEFAULT_ENGINE,
+                        help='search engine, the averaging search (with NumPy at the end of the search, or with '
+                             'the static evaluation) or the alpha-beta search')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS,
+                        help='number of the rows of the board')
+    parser.add_argument('--columns', type=int, default=DEFAULT_COLUMNS,
+                        help='number of the columns of the board')
+    parser.add_argument('--win-length', type=int, default=DEFAULT_WIN_LENGTH,
+                        help='number of the tokens in a line which win the game')
+    parser.add_argument('--depth', type=int, default=None,
+                        help='depth of the search, or the maximum depth if the time budget is given')
+    parser.add_argument('--time', type=float, default=None,
+                        help='time budget for one move in seconds, the search is deepened until it runs out')
+    parser.add_argument('--backend', choices=[BACKEND_MPI, BACKEND_LOCAL], default=DEFAULT_BACKEND,
+                        help='run the workers as MPI ranks, or as local processes without MPI')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='number of the worker processes for the local backend')
+    parser.add_argument('--book', default=None,
+                        help='opening book which is consulted before the search')
+    parser.add_argument('--generate-book', default=None, metavar='PATH',
+                        help='generate the opening book into the given file instead of playing')
+    parser.add_argument('--book-moves', type=int, default=BOOK_MOVES,
+                        help='maximum number of tokens on the board for the positions in the generated book')
+    parser.add_argument('--self-play', action='store_true',
+                        help='play the games of the engine against itself instead of playing against the player')
+    parser.add_argument('--openings', default=None,
+                        help='file with the openings of the self-play games, one line of columns per game')
+    parser.add_argument('--games', type=int, default=None,
+                        help='number of the self-play games, by default one game per opening')
+    parser.add_argument('--shared-bounds', action='store_true',
+                        help='share the alpha-beta windows between the tasks, only for the alpha-beta engine; '
+                             'the columns which can\'t be the best one get only a bound')
+    parser.add_argument('--hierarchical', action='store_true',
+                        help='the master sends the tasks to one sub-master per machine, which splits them '
+                             'between the workers of its machine, only for the MPI backend')
+    parser.add_argument('--shared-table', action='store_true',
+                        help='share the transposition table between the workers on the same machine')
+    parser.add_argument('--bound-columns', action='store_true',
+                        help='stop the searches of the columns which can\'t be the best one, only for the alpha-beta '
+                             'engine; they are printed as ' + BOUNDED_COLUMN + ' instead of their evaluations')
+    parser.add_argument('--endgame', type=int, default=ENDGAME_CELLS, metavar='CELLS',
+                        help='solve the positions with at most this many empty cells to the end of the game, '
+                             'the solved wins are 1 with the next move and closer to 0 when they come later')
+    parser.add_argument('--ponder', action='store_true',
+                        help='search the positions after the possible moves of the player while the player thinks')
+    parser.add_argument('--serve', default=None, metavar='ADDRESS',
+                        help='play the games of the clients which connect to the unix socket with the given path, '
+                             'or to the TCP address host:port, with the same workers')
+    parser.add_argument('--timing', action='store_true',
+                        help='print the duration of every computers move and the counters of the workers')
+    parser.add_argument('--stats', default=None, metavar='PATH',
+                        help='append the counters of the workers for every move to the file of JSON lines')
+    arguments = parser.parse_args()
+    if arguments.shared_bounds and arguments.engine != ENGINE_ALPHABETA:
+        parser.error('the shared bounds need the alpha-beta engine')
+    if arguments.bound_columns and arguments.engine != ENGINE_ALPHABETA:
+        parser.error('the bounded columns need the alpha-beta engine')
+    if arguments.hierarchical and arguments.backend != BACKEND_MPI:
+        parser.error('the sub-masters need the MPI backend')
+    arguments.dimensions = (arguments.rows, arguments.columns, arguments.win_length)
+    if arguments.depth is None:
+        arguments.depth = Analysis.default_depth(arguments.engine, arguments.time, arguments.dimensions)
+    return arguments
+
+
+def opening_positions(board, moves, played, positions):
+    """
+    Finds all positions with at most 'moves' tokens where the computer is on the move.
+    :param board: The game board, it is restored after the search
+    :param moves: Maximum number of tokens on the board
+    :param played: Columns of the moves which lead to the current position
+    :param positions: Dictionary which gets the moves leading to every position, by the hash of the position
+    """
+    if board.last_player == Player.HUMAN and board.hash not in positions:
+        positions[board.hash] = list(played)
+    if board.moves == moves:
+        return
+
+    for col in range(board.columns):
+        if Helper.is_move_legal(board, col):
+            board.make_a_move(col)
+            played.append(col)
+            if not Helper.is_game_finished(board, col):
+                opening_positions(board, moves, played, positions)
+            played.pop()
+            board.undo_last_move(col)
+
+
+def generate_book(executor, arguments):
+    """
+    Evaluates all opening positions with the workers and writes them into the opening book.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param arguments: Parsed command line arguments
+    """
+    # the book keeps only the evaluations, never the bounds
+    arguments = copy.copy(arguments)
+    arguments.shared_bounds = False
+    arguments.bound_columns = False
+    board = Board(*arguments.dimensions)
+    task_ids = itertools.count()
+    positions = {}
+    evaluations = {}
+    opening_positions(board, arguments.book_moves, [], positions)
+
+    for index, (key, moves) in enumerate(positions.items()):
+        for col in moves:
+            board.make_a_move(col)
+        evaluations[key] = Scheduler.search(executor, board, arguments, task_ids)
+        for col in reversed(moves):
+            board.undo_last_move(col)
+        print(str(index + 1) + '/' + str(len(positions)))
+        sys.stdout.flush()
+
+    OpeningBook.write(arguments.generate_book, evaluations, arguments.engine, arguments.depth, arguments.dimensions)
+
+
+def load_book(arguments):
+    """
+    Opens the opening book given by the arguments.
+    :param arguments: Parsed command line arguments
+    :return: OpeningBook, or None if no book is given
+    """
+    if arguments.book is None:
+        return None
+    book = OpeningBook(arguments.book)
+    if book.engine != arguments.engine:
+        raise ValueError('The opening book was generated by the engine ' + book.engine + '!')
+    if book.dimensions != arguments.dimensions:
+        raise ValueError('The opening book was generated for the board ' + str(book.dimensions) + '!')
+    # the book of the shallower search would play weaker openings than the search which is asked for
+    if arguments.time is None and book.depth < arguments.depth:
+        raise ValueError('The opening book was generated with the depth ' + str(book.depth) + '!')
+    if arguments.time is not None:
+        print('The opening book was generated with the depth ' + str(book.depth) + ', without the time budget.')
+    return book
+
+
+def read_moves(moves):
     """
-    communicator = MPI.COMM_WORLD
-    size = communicator.size
-    rank = communicator.rank
-
-    # the master
-    if rank == 0:
-        # initialize the board
-        board = Board()
-
-        while True:
-            depth = DEFAULT_DEPTH
-            # get the players move, and if the column is full, enter it again
+    Reads the moves of the player in the background, so the master can search while the player thinks.
+    :param moves: Queue which gets the lines, and None at the end of the input
+    """
+    while True:
+        try:
+            moves.put(input())
+        except EOFError:
+            moves.put(None)
+            return
+
+
+def master(executor, arguments):
+    """
+    The master reads the moves of the player and plays the moves of the computer.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param arguments: Parsed command line arguments
+    """
+    # initialize the board
+    board = Board(*arguments.dimensions)
+    task_ids = itertools.count()
+    book = load_book(arguments)
+    ponder = None
+
+    if arguments.ponder:
+        moves = queue.Queue()
+        threading.Thread(target=read_moves, args=(moves,), daemon=True).start()
+
+    while True:
+        # get the players move, and if the column is full, enter it again
+        if arguments.ponder:
+            if ponder is None:
+                ponder = Pondering.Ponder(executor, board, arguments, task_ids, book)
+            players_move = ponder.wait(moves)
+            if players_move is None:
+                ponder.finish(None)
+                raise EOFError('The input has ended!')
+        else:
             players_move = input()
-            if not Helper.is_move_legal(board, int(players_move)):
-                continue
-            board.make_a_move(int(players_move))
-            board.print_out_board()
-            sys.stdout.flush()
+        if not Helper.is_move_legal(board, int(players_move)):
+            continue
+        board.make_a_move(int(players_move))
+        board.print_out_board()
+        sys.stdout.flush()
+
+        # start the timer
+        start = time.time()
+        statistics = SearchStatistics()
+
+        # the search of the players move goes on, the other searches are stopped
+        results = None
+        if ponder is not None:
+            results = ponder.finish(int(players_move))
+            if results is not None:
+                statistics = ponder.statistics
+            ponder = None
 
-            # if the game is finished, done
-            if Helper.is_game_finished(board, int(players_move)):
-                exit()
-
-            best_move = -2
-            evaluate_results = {}
-            worker_rank = 1
-            tasks = 0
-
-            # start the timer
-            # start = time.time()
-
-            # create the MasterMessage and send them to the workers "in a circle", so they can start with a task
-            # there will be 49 of them
-            for col in range(BOARD_SIZE):
-                for col2 in range(BOARD_SIZE):
-                    msg = MasterMessage(board, col, col2, depth)
-                    communicator.send(msg, dest=worker_rank % size)
-                    tasks += 1
-                    worker_rank += 1
-                    # skip the master
-                    if worker_rank % size == 0:
-                        worker_rank += 1
-
-            for i in range(tasks):
-                # get the WorkerMessage
-                evaluation = communicator.recv(source=MPI.ANY_SOURCE)
-                if evaluation.col not in evaluate_results:
-                    evaluate_results[evaluation.col] = []
-                # put it into the dictionary of evaluations by the column
-                evaluate_results[evaluation.col].append(evaluation.eval)
-
-            # calculate the best evaluations
-            results = Helper.get_max_evaluation(evaluate_results, board)
-
-            best_col = -1
-
-            # get the best column for the next move
-            for index, value in enumerate(results):
-                if value != FULL_COLUMN and value > best_move:
-                    best_move = value
-                    best_col = index
-
-            # format and print out the results
-            results = [FULL_COLUMN if res == FULL_COLUMN else FORMATTING.format(res) for res in results]
-            print(', '.join(results))
+        # if the game is finished, done
+        if Helper.is_game_finished(board, int(players_move)):
+            return
+
+        # calculate the best evaluations, the positions from the opening book are not searched
+        if results is None and book is not None:
+            results = book.lookup(board)
+        if results is None:
+            results = Scheduler.search(executor, board, arguments, task_ids, statistics)
+        report = statistics.report(executor.workers)
+        report['response'] = time.time() - start
+        if arguments.stats is not None:
+            report['moves'] = board.moves
+            Instrumentation.dump(arguments.stats, report)
+
+        # get the best column for the next move
+        best_col = Helper.get_best_column(results, arguments.engine)
+
+        # format and print out the results
+        results = [res if res in (FULL_COLUMN, BOUNDED_COLUMN) else FORMATTING.format(res) for res in results]
+        print(', '.join(results))
+        sys.stdout.flush()
+
+        # pc makes the move
+        board.make_a_move(best_col)
+        board.print_out_board()
+
+        # print the time and the counters of the workers
+        if arguments.timing:
+            print('response ' + FORMATTING.format(report['response']) + ' s')
+            print('\n'.join(Instrumentation.format_report(report)))
             sys.stdout.flush()
 
-            # pc makes the move
-            board.make_a_move(best_col)
-            board.print_out_board()
+        # if the game is finished, done
+        if Helper.is_game_finished(board, best_col):
+            return
 
-            # stop the timer and print the time
-            # end = time.time()
-            # print(end-start)
 
-            # if the game is finished, done
-            if Helper.is_game_finished(board, best_col):
-                exit()
+if __name__ == "__main__":
+    """
+    Main method which tests out the Connect4 game.
+    The game runs by entering 'mpiexec -n <processes_number> python Main.py [--engine alphabeta] [--time 2]'
+    into the terminal, or 'python Main.py --backend local [--processes <processes_number>]' without MPI.
+    The opening book is made by 'python Main.py --generate-book <path>' and used by 'python Main.py --book <path>'.
+    The engine plays against itself with 'python Main.py --self-play [--openings <path>] [--games <number>]'.
+    The workers search while the player thinks with 'python Main.py --ponder'.
+    The master of many machines sends the tasks through one sub-master per machine with
+    'mpiexec -n <processes_number> python Main.py --hierarchical'.
+    The workers on one machine share the transposition table with 'python Main.py --shared-table'.
+    The last empty cells are solved exactly with 'python Main.py --endgame <cells>', 0 turns the solver off.
+    Many games are played at once by the clients of 'python Main.py --serve <socket path or host:port>'.
+    Other boards are played with 'python Main.py --rows 6 --columns 7 [--win-length 4]'.
+    """
+    arguments = parse_arguments()
+    run = master
+    if arguments.generate_book is not None:
+        run = generate_book
+    elif arguments.self_play:
+        run = SelfPlay.self_play
+    elif arguments.serve is not None:
+        run = Server.serve
 
-    # the workers
+    if arguments.backend == BACKEND_LOCAL:
+        executor = Executors.LocalExecutor(arguments.processes, arguments.engine, arguments.dimensions,
+                                           arguments.shared_table)
+        try:
+            run(executor, arguments)
+        finally:
+            executor.close()
     else:
-        while True:
-            # get the MasterMessage
-            message = communicator.recv(source=0)
-            # if the column is not full make a move, and check if the game can be finished
-            if Helper.is_move_legal(message.board, message.col1):
-                message.board.make_a_move(message.col1)
-                if Helper.is_game_finished(message.board, message.col1):
-                    res = COMPUTER_WIN
-                else:
-                    # if the column is not full make a move, and check if the game can be finished
-                    if Helper.is_move_legal(message.board, message.col2):
-                        message.board.make_a_move(message.col2)
-                        if Helper.is_game_finished(message.board, message.col2):
-                            res = PLAYER_WIN
-                        else:
-                            # if the game is not yet finished, evaluate the next move
-                            res = Helper.evaluate(message.board, message.col1, message.depth)
-                        message.board.undo_last_move(message.col2)
-                message.board.undo_last_move(message.col1)
-            else:
-                # the column is full
-                res = FULL_COLUMN
-            # send the WorkerMessage
-            communicator.send(WorkerMessage(message.col1, res), dest=0)
+        from mpi4py import MPI
+
+        # the master talks to the workers, or to the sub-masters which pass the tasks to the workers of their machine
+        communicator = MPI.COMM_WORLD
+        local = None
+        slots = None
+        if arguments.hierarchical:
+            communicator, local, slots = Hierarchy.split_nodes(MPI.COMM_WORLD)
+        # the master
+        if MPI.COMM_WORLD.rank == 0:
+            executor = Executors.MPIExecutor(communicator, arguments.shared_table and not arguments.hierarchical, slots)
+            try:
+                run(executor, arguments)
+            finally:
+                executor.close()
+        # the sub-masters
+        elif communicator is not None and local is not None:
+            Hierarchy.sub_master(communicator, local, arguments.engine, arguments.dimensions, arguments.shared_table)
+        # the workers
+        else:
+            Executors.mpi_worker(local or communicator, arguments.engine, arguments.dimensions,
+                                 arguments.shared_table)
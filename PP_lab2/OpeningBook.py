@@ -0,0 +1,118 @@
+from Constants import *
+
+import json
+import numpy as np
+
+
+class OpeningBook:
+    """
+    Class OpeningBook represents precomputed evaluations of the opening positions, stored in a file.
+    The file has a header with the settings of the search, the sorted Zobrist hashes of the positions,
+    and the evaluations of the columns for every position. The hashes and the evaluations are memory mapped,
+    so the processes on one machine share the pages of the file instead of loading their own copies.
+    Full columns are stored as NaN.
+    """
+    MAGIC = b'C4BOOK01'
+
+    def __init__(self, path):
+        """
+        Initialization method. Opens the book.
+        :param path: Path of the book file
+        """
+        with open(path, 'rb') as book_file:
+            if book_file.read(len(OpeningBook.MAGIC)) != OpeningBook.MAGIC:
+                raise ValueError('File ' + str(path) + ' is not an opening book!')
+            length = int(np.frombuffer(book_file.read(8), dtype='<u8')[0])
+            self._settings = json.loads(book_file.read(length).decode('utf-8'))
+
+        offset = OpeningBook.header_size(length)
+        size = self._settings['size']
+        columns = self._settings['columns']
+        if size == 0:
+            self._keys = np.empty(0, dtype='<u8')
+            self._scores = np.empty((0, columns), dtype='<f8')
+        else:
+            self._keys = np.memmap(path, dtype='<u8', mode='r', offset=offset, shape=(size,))
+            self._scores = np.memmap(path, dtype='<f8', mode='r', offset=offset + 8 * size, shape=(size, columns))
+
+    @staticmethod
+    def header_size(length):
+        """
+        Size of the header with the settings, rounded up so the arrays are aligned.
+        :param length: Length of the settings in bytes
+        :return: Size of the header in bytes
+        """
+        size = len(OpeningBook.MAGIC) + 8 + length
+        return size + (-size) % 8
+
+    @staticmethod
+    def write(path, evaluations, engine, depth, dimensions=DEFAULT_DIMENSIONS):
+        """
+        Writes the book file.
+        :param path: Path of the book file
+        :param evaluations: Dictionary of the evaluations by the column, by the hash of the position
+        :param engine: Name of the engine which made the evaluations
+        :param depth: Depth of the search
+        :param dimensions: Tuple (rows, columns, win length) of the board
+        """
+        rows, columns, win_length = dimensions
+        keys = np.array(sorted(evaluations), dtype='<u8')
+        scores = np.array([[np.nan if value == FULL_COLUMN else value for value in evaluations[int(key)]]
+                           for key in keys], dtype='<f8').reshape(len(keys), columns)
+        settings = json.dumps({'engine': engine, 'depth': depth, 'rows': rows, 'columns': columns,
+                               'win_length': win_length, 'size': len(keys)})
+        settings = settings.encode('utf-8')
+        length = len(settings)
+
+        with open(path, 'wb') as book_file:
+            book_file.write(OpeningBook.MAGIC)
+            book_file.write(np.array([length], dtype='<u8').tobytes())
+            book_file.write(settings)
+            book_file.write(b'\0' * (OpeningBook.header_size(length) - len(OpeningBook.MAGIC) - 8 - length))
+            book_file.write(keys.tobytes())
+            book_file.write(scores.tobytes())
+
+    def lookup(self, board):
+        """
+        Finds the evaluations for the position on the board.
+        :param board: The game board
+        :return: Evaluations by the column, or None if the position is not in the book
+        """
+        key = np.uint64(board.hash)
+        index = int(np.searchsorted(self._keys, key))
+        if index == len(self._keys) or self._keys[index] != key:
+            return None
+        return [FULL_COLUMN if np.isnan(value) else float(value) for value in self._scores[index]]
+
+    @property
+    def engine(self):
+        """
+        Getter for the engine property.
+        :return: Name of the engine which made the evaluations
+        """
+        return self._settings['engine']
+
+    @property
+    def depth(self):
+        """
+        Getter for the depth property.
+        :return: Depth of the search
+        """
+        return self._settings['depth']
+
+    @property
+    def dimensions(self):
+        """
+        Getter for the dimensions property.
+        :return: Tuple (rows, columns, win length) of the board
+        """
+        return (self._settings.get('rows', DEFAULT_ROWS), self._settings['columns'],
+                self._settings.get('win_length', DEFAULT_WIN_LENGTH))
+
+    @property
+    def size(self):
+        """
+        Getter for the size property.
+        :return: Number of the positions in the book
+        """
+        return len(self._keys)
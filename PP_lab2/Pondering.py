@@ -0,0 +1,114 @@
+from Board import Board
+from Constants import *
+
+import Helper
+from Instrumentation import SearchStatistics
+import Scheduler
+
+import queue
+
+
+class Ponder:
+    """
+    Class Ponder searches the positions after every possible move of the player while the player thinks.
+    When the move is made, the search of that position goes on as the search for the move of the computer,
+    and the searches of the other positions are cancelled.
+    """
+    def __init__(self, executor, board, arguments, task_ids, book=None):
+        """
+        Initialization method. Starts the searches.
+        :param executor: MPIExecutor or LocalExecutor which runs the tasks
+        :param board: The game board, the player is on the move
+        :param arguments: Parsed command line arguments
+        :param task_ids: Iterator of the identifiers for the search rounds
+        :param book: OpeningBook, the positions from the book are not searched, or None
+        """
+        # the counters of the pondering are a part of the move which is played
+        self._statistics = SearchStatistics()
+        self._scheduler = Scheduler.Scheduler(executor, self._statistics)
+        # MoveSearch by the column of the players move
+        self._searches = {}
+        # the column of the players move by the running search round
+        self._rounds = {}
+
+        replies = []
+        for col in range(board.columns):
+            if not Helper.is_move_legal(board, col):
+                continue
+            reply = Board(board.rows, board.columns, board.win_length)
+            reply.set_position(board.computer_mask, board.human_mask)
+            reply.make_a_move(col)
+            # the computer has no move to search after the end of the game
+            if Helper.is_game_finished(reply, col) or reply.moves == reply.cells:
+                continue
+            if book is not None and book.lookup(reply) is not None:
+                continue
+            replies.append((col, reply))
+
+        # the searches share the workers, so the tasks are split only if there are fewer searches than workers
+        workers = max(1, self._scheduler.workers // max(1, len(replies)))
+        for col, reply in replies:
+            self._searches[col] = Scheduler.MoveSearch(reply, arguments, task_ids, workers, self._statistics, True)
+            self._next_round(col)
+
+    @property
+    def statistics(self):
+        """
+        Getter for the statistics property.
+        :return: SearchStatistics of all searches, from the start of the pondering
+        """
+        return self._statistics
+
+    def _next_round(self, column):
+        """
+        Starts the next search round of the position after the players move.
+        :param column: Column of the players move
+        """
+        search_round = self._searches[column].next_round()
+        if search_round is not None:
+            self._rounds[search_round.task_id] = column
+            self._scheduler.add(search_round)
+
+    def step(self, timeout=None):
+        """
+        Waits for the next result, and continues the searches whose rounds are finished.
+        :param timeout: Maximum waiting time in seconds, or None to wait until a result arrives
+        """
+        for search_round in self._scheduler.step(timeout):
+            column = self._rounds.pop(search_round.task_id)
+            move_search = self._searches.get(column)
+            if move_search is not None:
+                move_search.finish_round(search_round)
+                self._next_round(column)
+
+    def wait(self, moves):
+        """
+        Searches until the player makes the move.
+        :param moves: Queue of the lines with the moves of the player
+        :return: The next line, or None at the end of the input
+        """
+        while self._scheduler.active:
+            try:
+                return moves.get_nowait()
+            except queue.Empty:
+                self.step(PONDER_INTERVAL)
+        return moves.get()
+
+    def finish(self, column):
+        """
+        Keeps the search of the players move and cancels the others.
+        The kept search is continued until it is finished.
+        :param column: Column of the players move, or None to cancel all searches
+        :return: Evaluations by the column, or None if the position after the move has not been searched
+        """
+        move_search = self._searches.get(column)
+        self._searches = {column: move_search} if move_search is not None else {}
+        for task_id, col in self._rounds.items():
+            if col != column:
+                self._scheduler.cancel(task_id)
+
+        if move_search is not None:
+            move_search.resume(self._scheduler.workers)
+        while self._scheduler.active:
+            self.step()
+        return move_search.results if move_search is not None else None
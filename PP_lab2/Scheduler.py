@@ -0,0 +1,774 @@
+from Board import Player
+from Constants import *
+
+import Helper
+from Helper import MasterMessage
+from Instrumentation import SearchStatistics
+
+from collections import deque
+import time
+
+
+def mirror_task(task, columns):
+    """
+    Mirrors the task, the moves are made in the mirrored columns.
+    :param task: Tuple of the columns
+    :param columns: Number of columns
+    :return: Mirrored task
+    """
+    return tuple(columns - 1 - col for col in task)
+
+
+def create_tasks(board, depth, workers, engine, costs):
+    """
+    Creates the tasks for one search round, the most expensive ones first.
+    Tasks whose result is known without the search are evaluated right away.
+    If the position is symmetric, only one task of every mirrored pair is searched.
+    If there are more workers than tasks, every task is split into the tasks for the next move.
+    :param board: The game board
+    :param depth: Depth of the search
+    :param workers: Number of the workers
+    :param engine: Name of the engine
+    :param costs: Dictionary of the measured durations of the tasks from the previous rounds
+    :return: List of the tasks (tuples of columns) and dictionary of the known evaluations by the task
+    """
+    tasks = []
+    evaluations = {}
+
+    columns = board.columns
+    for col in range(columns):
+        for col2 in range(columns):
+            evaluation = Helper.evaluate_task(board, (col, col2), depth, None)
+            if evaluation is None:
+                tasks.append((col, col2))
+            else:
+                evaluations[(col, col2)] = evaluation
+
+    # the mirrored task has the same evaluation, it is copied when the round is finished
+    symmetric = board.is_symmetric()
+    if symmetric:
+        tasks = [task for task in tasks if task <= mirror_task(task, columns)]
+
+    # split the tasks, so every worker has something to do
+    if 0 < len(tasks) < workers and depth > 0:
+        split_tasks = []
+        for col, col2 in tasks:
+            for col3 in range(columns):
+                evaluation = Helper.evaluate_task(board, (col, col2, col3), depth - 1, None)
+                if evaluation is None:
+                    split_tasks.append((col, col2, col3))
+                else:
+                    evaluations[(col, col2, col3)] = evaluation
+        tasks = split_tasks
+        if symmetric:
+            tasks = [task for task in tasks if task <= mirror_task(task, columns)]
+
+    # without the measurements, the central columns are expected to be the most expensive ones
+    order = {col: index for index, col in enumerate(Helper.move_order(columns))}
+    tasks.sort(key=lambda task: (-costs.get(task, 0.0), [order[col] for col in task]))
+    return tasks, evaluations
+
+
+def collect_results(board, evaluations, engine):
+    """
+    Groups the evaluations of the tasks by the column of the first move.
+    Evaluations of the split tasks are combined first.
+    :param board: The game board
+    :param evaluations: Dictionary of the evaluations by the task
+    :param engine: Name of the engine
+    :return: Dictionary of the evaluations by the column
+    """
+    evaluate_results = {}
+    columns = board.columns
+
+    for col in range(columns):
+        evaluate_results[col] = []
+        for col2 in range(columns):
+            if (col, col2) in evaluations:
+                evaluation = evaluations[(col, col2)]
+            else:
+                # the reply is made by the player who made the last move on the board
+                split = [evaluations[(col, col2, col3)] for col3 in range(columns)]
+                split = [evaluation for evaluation in split if evaluation != FULL_COLUMN]
+                evaluation = Helper.reduce_evaluations(split, board.last_player, engine)
+            evaluate_results[col].append(evaluation)
+
+    return evaluate_results
+
+
+class SearchRound:
+    """
+    Class SearchRound holds the tasks of one search of the given depth and their evaluations.
+    The column whose score is proven, because all its replies are known or one reply decides it,
+    is not searched further, and its running tasks are stopped.
+    With the bounded columns the round ends as soon as the best column is decided: the columns which can't be
+    the best one are stopped too, and they are reported as bounded, because their scores are not known.
+    The scores are from the perspective of the player on the move, unless they are said to be for the computer.
+    """
+    def __init__(self, board, depth, task_id, engine, workers, deadline=None, costs=None, statistics=None,
+                 bounded=False):
+        """
+        Initialization method. Creates the tasks.
+        :param board: The game board, it must not change until the round is finished
+        :param depth: Depth of the search
+        :param task_id: Identifier of this search round
+        :param engine: Name of the engine
+        :param workers: Number of the workers which are expected to work on the round
+        :param deadline: time.time() after which the round is cancelled, or None
+        :param costs: Dictionary of the measured durations of the tasks, it is updated with this round
+        :param statistics: SearchStatistics which gets the counters of the tasks, or None
+        :param bounded: True if the columns which can't be the best one are stopped
+        """
+        self._board = board
+        self._depth = depth
+        self._task_id = task_id
+        self._engine = engine
+        self._deadline = deadline
+        self._costs = costs if costs is not None else {}
+        self._statistics = statistics if statistics is not None else SearchStatistics()
+        tasks, self._evaluations = create_tasks(board, depth, workers, engine, self._costs)
+        self._pending = deque(tasks)
+        # the task and its start time by the worker
+        self._running = {}
+        self._cancelled = False
+        self._sign = 1 if board.last_player == Player.HUMAN else -1
+        self._symmetric = board.is_symmetric()
+        self._rank = {col: index for index, col in enumerate(self._order())}
+        # the window of the task of every worker, from the perspective of the computer
+        self._windows = {}
+        self._bounded = bounded
+        # the columns which can't be the best one, or whose score is known
+        self._closed = set()
+        # the columns whose evaluations are only bounds
+        self._bounds = set()
+        self._update()
+
+    @property
+    def board(self):
+        """
+        Getter for the board property.
+        :return: The game board
+        """
+        return self._board
+
+    @property
+    def task_id(self):
+        """
+        Getter for the task_id property.
+        :return: Identifier of the search round
+        """
+        return self._task_id
+
+    @property
+    def engine(self):
+        """
+        Getter for the engine property.
+        :return: Name of the engine whose evaluations the round has
+        """
+        return self._engine
+
+    @property
+    def deadline(self):
+        """
+        Getter for the deadline property.
+        :return: time.time() after which the round is cancelled, or None
+        """
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, deadline):
+        """
+        Setter for the deadline property.
+        :param deadline: time.time() after which the round is cancelled, or None
+        """
+        self._deadline = deadline
+
+    @property
+    def bounded_columns(self):
+        """
+        Getter for the bounded_columns property.
+        :return: Set of the columns whose evaluations are only bounds, they are never the best column
+        """
+        return self._bounds
+
+    @property
+    def cancelled(self):
+        """
+        Getter for the cancelled property.
+        :return: True if the round has been cancelled
+        """
+        return self._cancelled
+
+    @property
+    def finished(self):
+        """
+        Getter for the finished property.
+        :return: True if no task is left and every sent task has been answered
+        """
+        return not self._running and (self._cancelled or not self._pending)
+
+    def has_tasks(self):
+        """
+        Checks if there are tasks which can be sent.
+        :return: True if there are tasks
+        """
+        return bool(self._pending) and not self._cancelled
+
+    def _order(self):
+        """
+        Order in which the columns with the same score are chosen, it is the one of the function
+        'Helper.get_best_column'.
+        :return: List of the columns
+        """
+        return Helper.preference_order(self._board.columns, self._engine)
+
+    def _evaluation(self, task):
+        """
+        Evaluation of the task, in the symmetric position it can be the evaluation of the mirrored task.
+        :param task: Tuple of the columns
+        :return: Evaluation from the perspective of the computer, or None if it is not known
+        """
+        evaluation = self._evaluations.get(task)
+        if evaluation is None and self._symmetric:
+            evaluation = self._evaluations.get(mirror_task(task, self._board.columns))
+        return evaluation
+
+    def _reply(self, col1, col2):
+        """
+        Evaluation of the reply, the split tasks are combined.
+        :param col1: Column of the move
+        :param col2: Column of the reply
+        :return: Evaluation from the perspective of the computer, or None if it is not known
+        """
+        evaluation = self._evaluation((col1, col2))
+        if evaluation is not None:
+            return evaluation
+        split = [self._evaluation((col1, col2, col3)) for col3 in range(self._board.columns)]
+        if None in split:
+            return None
+        split = [evaluation for evaluation in split if evaluation != FULL_COLUMN]
+        return Helper.reduce_evaluations(split, self._board.last_player, self._engine)
+
+    def _interval(self, col1):
+        """
+        Range of the score of the column. The unknown replies are counted as the losses for the lowest score,
+        and as the wins for the highest one, so the highest score is the one the column gets if it is stopped.
+        :param col1: Column of the move
+        :return: Tuple (lowest, highest), or None if the move can't be made
+        """
+        if not Helper.is_move_legal(self._board, col1):
+            return None
+        replies = [self._reply(col1, col2) for col2 in range(self._board.columns)]
+        interval = []
+        for unknown in (PLAYER_WIN, COMPUTER_WIN):
+            evaluations = [self._sign * unknown if reply is None else reply for reply in replies]
+            # the same calculation as for the results, so the scores can be compared exactly
+            score = Helper.get_max_evaluation({col1: evaluations}, self._board, self._engine)[col1]
+            interval.append(self._sign * score)
+        return tuple(interval)
+
+    def _window(self, col1):
+        """
+        Window of the tasks of the column.
+        :param col1: Column of the move
+        :return: Tuple (lower, upper), it is closed if the tasks of the column can't change the best column
+        """
+        if col1 in self._closed:
+            return COMPUTER_WIN, COMPUTER_WIN
+        return PLAYER_WIN, COMPUTER_WIN
+
+    def _computer_window(self, col1):
+        """
+        Window of the tasks of the column, from the perspective of the computer.
+        :param col1: Column of the move
+        :return: Tuple (lower, upper)
+        """
+        lower, upper = self._window(col1)
+        return (lower, upper) if self._sign == 1 else (-upper, -lower)
+
+    def _update(self):
+        """
+        Closes the columns whose score is known, and with the bounded columns the columns which can't be
+        the best one. The column can't be the best one if another column is sure to get a higher score,
+        or the same score if that column comes first. The tasks of the closed columns are dropped.
+        """
+        intervals = {col: self._interval(col) for col in range(self._board.columns)}
+        intervals = {col: interval for col, interval in intervals.items() if interval is not None}
+        for col, (lowest, highest) in intervals.items():
+            if col in self._closed:
+                continue
+            if lowest == highest:
+                self._closed.add(col)
+            elif self._bounded and any(other_lowest > highest or (other_lowest == highest and
+                                                                  self._rank[other] < self._rank[col])
+                                       for other, (other_lowest, other_highest) in intervals.items()
+                                       if other != col):
+                self._closed.add(col)
+                self._bounds.add(col)
+
+        windows = {}
+        pending = deque()
+        for task in self._pending:
+            if task[0] not in windows:
+                windows[task[0]] = self._window(task[0])
+            lower, upper = windows[task[0]]
+            # the dropped tasks count as the wins, so the score of the column is its highest possible score
+            if lower >= upper:
+                self._evaluations[task] = self._sign * COMPUTER_WIN
+            else:
+                pending.append(task)
+        self._pending = pending
+
+    def next_message(self, worker):
+        """
+        Takes the next task for the worker, with the window of its column.
+        :param worker: Identifier of the worker
+        :return: MasterMessage with the task
+        """
+        task = self._pending.popleft()
+        self._running[worker] = (task, time.time())
+        self._windows[worker] = self._computer_window(task[0])
+        return self._message(task, self._windows[worker])
+
+    def _message(self, task, window=None):
+        """
+        Makes the message of the task.
+        :param task: Tuple of the columns
+        :param window: Tuple (lower, upper) of the alpha-beta window from the perspective of the computer, or None
+        :return: MasterMessage with the task
+        """
+        split = task[2] if len(task) == 3 else None
+        depth = self._depth - 1 if split is not None else self._depth
+        return MasterMessage(self._board, task[0], task[1], depth, self._task_id, split, window)
+
+    def record(self, worker, evaluation):
+        """
+        Stores the result of the worker, and closes the columns which are decided.
+        :param worker: Identifier of the worker
+        :param evaluation: WorkerMessage with the result
+        """
+        task, start = self._running.pop(worker)
+        lower, upper = self._windows.pop(worker)
+        # the work of the cancelled tasks counts too, it has been done
+        self._statistics.record(worker, evaluation)
+        # results of the cancelled tasks are only collected, so no message is left behind
+        if self._cancelled:
+            return
+        if evaluation.eval == ABORTED:
+            # the task has been stopped because its window was closed
+            self._evaluations[task] = self._sign * COMPUTER_WIN
+        else:
+            self._costs[task] = time.time() - start
+            self._evaluations[task] = self._score(evaluation.eval)
+            # the result which fails low in the open window is only the upper bound of the reply,
+            # and so of the column
+            lower, upper = (lower, upper) if self._sign == 1 else (-upper, -lower)
+            if PLAYER_WIN < lower < upper and self._sign * self._evaluations[task] <= lower:
+                self._bounds.add(task[0])
+        self._update()
+
+    def _score(self, evaluation):
+        """
+        Evaluation of the result of the worker.
+        :param evaluation: Evaluation of the task from the worker
+        :return: Evaluation from the perspective of the computer
+        """
+        return evaluation
+
+    def bounds(self):
+        """
+        Tightened windows of the running tasks, the closed windows stop the tasks.
+        :return: List of the tuples (worker, MasterMessage of the running task with the new window)
+        """
+        updates = []
+        for worker, (task, start) in self._running.items():
+            window = self._computer_window(task[0])
+            if window != self._windows[worker]:
+                self._windows[worker] = window
+                updates.append((worker, self._message(task, window)))
+        return updates
+
+    def cancel(self):
+        """
+        Cancels the round, the tasks which are not sent are dropped.
+        :return: List of the workers which are working on the round
+        """
+        self._cancelled = True
+        return list(self._running)
+
+    def result(self):
+        """
+        Evaluations of the finished round.
+        :return: Dictionary of the evaluations by the column, or None if the round was cancelled
+        """
+        if self._cancelled:
+            return None
+        if self._symmetric:
+            for task, evaluation in list(self._evaluations.items()):
+                self._evaluations.setdefault(mirror_task(task, self._board.columns), evaluation)
+        return collect_results(self._board, self._evaluations, self._engine)
+
+
+class BoundedRound(SearchRound):
+    """
+    Class BoundedRound searches the tasks of the alpha-beta engine with the windows shared between them.
+    The tasks of the principal column are sent first, and the score of the best finished column becomes
+    the lower bound of the other columns. The finished replies of a column are its upper bound.
+    The running tasks get the tightened windows while they search.
+    """
+    def __init__(self, board, depth, task_id, engine, workers, deadline=None, costs=None, statistics=None,
+                 principal=None):
+        """
+        Initialization method. Creates the tasks.
+        :param board: The game board, it must not change until the round is finished
+        :param depth: Depth of the search
+        :param task_id: Identifier of this search round
+        :param engine: Name of the engine
+        :param workers: Number of the workers which are expected to work on the round
+        :param deadline: time.time() after which the round is cancelled, or None
+        :param costs: Dictionary of the measured durations of the tasks, it is updated with this round
+        :param statistics: SearchStatistics which gets the counters of the tasks, or None
+        :param principal: The best column of the previous round, or None
+        """
+        # the best finished column and its score, they are needed by the first update
+        self._best = None
+        self._alpha = None
+        super().__init__(board, depth, task_id, engine, workers, deadline, costs, statistics, True)
+
+        if principal is None:
+            principal = Helper.move_order(board.columns)[0]
+        self._pending = deque(sorted(self._pending,
+                                     key=lambda task: -1 if task[0] == principal else self._rank[task[0]]))
+
+    def _window(self, col1):
+        """
+        Window of the tasks of the column. The column has to be better than the best one,
+        or as good if it comes first in the move order, and the worst known reply is the upper bound.
+        :param col1: Column of the move
+        :return: Tuple (lower, upper), it is closed if the column can't be the best one
+        """
+        if col1 in self._closed:
+            return COMPUTER_WIN, COMPUTER_WIN
+        lower = PLAYER_WIN
+        if self._best is not None:
+            lower = self._alpha if self._rank[col1] > self._rank[self._best] else max(PLAYER_WIN, self._alpha - 1)
+        return lower, self._interval(col1)[1]
+
+    def _update(self):
+        """
+        Finds the best column whose score is known, and closes the columns which can't be better.
+        """
+        for col1 in range(self._board.columns):
+            interval = self._interval(col1)
+            if interval is None or interval[0] != interval[1]:
+                continue
+            if (self._best is None or interval[0] > self._alpha or
+                    (interval[0] == self._alpha and self._rank[col1] < self._rank[self._best])):
+                self._best = col1
+                self._alpha = interval[0]
+        super()._update()
+
+
+class EndgameRound(SearchRound):
+    """
+    Class EndgameRound solves the tasks to the end of the game, whatever the engine is.
+    The tasks are searched by the function 'Helper.evaluate_endgame', and their scores are scaled by the function
+    'Helper.solved_value', so the win with the next move is 1 and the faster wins are better than the later ones.
+    The solved evaluations are combined as by the alpha-beta engine.
+    """
+    def __init__(self, board, task_id, engine, workers, costs=None, statistics=None, bounded=False):
+        """
+        Initialization method. Creates the tasks.
+        :param board: The game board, it must not change until the round is finished
+        :param task_id: Identifier of this search round
+        :param engine: Name of the engine of the game, the best column is chosen by its order
+        :param workers: Number of the workers which are expected to work on the round
+        :param costs: Dictionary of the measured durations of the tasks, it is updated with this round
+        :param statistics: SearchStatistics which gets the counters of the tasks, or None
+        :param bounded: True if the columns which can't be the best one are stopped
+        """
+        # the order of the columns is needed by the first update
+        self._game_engine = engine
+        # the tasks are not split, the solved positions are cheap
+        super().__init__(board, SOLVE_DEPTH, task_id, ENGINE_ALPHABETA, workers, None, costs, statistics, bounded)
+
+    def _order(self):
+        """
+        Order in which the columns with the same score are chosen by the engine of the game.
+        :return: List of the columns
+        """
+        return Helper.preference_order(self._board.columns, self._game_engine)
+
+    def _score(self, evaluation):
+        """
+        Scales the score of the solved task.
+        :param evaluation: Score of the function 'Helper.solve_negamax' from the perspective of the computer
+        :return: Evaluation from the perspective of the computer
+        """
+        return Helper.solved_value(evaluation, self._board)
+
+
+class Scheduler:
+    """
+    Class Scheduler distributes the tasks of several search rounds to the workers.
+    Every worker gets one task at a time, and the next one when it returns the result,
+    so the workers with the cheap tasks take over the rest of the work.
+    The rounds take turns in giving the tasks, so the workers are shared between them fairly.
+    """
+    def __init__(self, executor, statistics=None):
+        """
+        Initialization method.
+        :param executor: MPIExecutor or LocalExecutor which runs the tasks
+        :param statistics: SearchStatistics which gets the time spent waiting for the results, or None
+        """
+        self._executor = executor
+        self._statistics = statistics
+        self._rounds = {}
+        # identifiers of the rounds with the tasks, in the order of their turns
+        self._turns = deque()
+        self._idle = deque(executor.workers)
+
+    @property
+    def workers(self):
+        """
+        Getter for the workers property.
+        :return: Number of the workers
+        """
+        return len(self._executor.workers)
+
+    @property
+    def active(self):
+        """
+        Getter for the active property.
+        :return: Number of the rounds which are not finished
+        """
+        return len(self._rounds)
+
+    def add(self, search_round):
+        """
+        Starts the search round.
+        :param search_round: SearchRound
+        """
+        self._executor.start_round(search_round.board, search_round.task_id)
+        self._rounds[search_round.task_id] = search_round
+        self._turns.append(search_round.task_id)
+        self._assign()
+
+    def _assign(self):
+        """
+        Gives the tasks to the idle workers.
+        """
+        while self._idle and self._turns:
+            search_round = self._rounds.get(self._turns.popleft())
+            if search_round is None or not search_round.has_tasks():
+                continue
+            worker = self._idle.popleft()
+            self._executor.submit(worker, search_round.next_message(worker))
+            self._turns.append(search_round.task_id)
+
+    def _finished(self):
+        """
+        Removes the finished rounds.
+        :return: List of the finished rounds
+        """
+        finished = [search_round for search_round in self._rounds.values() if search_round.finished]
+        for search_round in finished:
+            del self._rounds[search_round.task_id]
+            self._executor.finish_round(search_round.task_id)
+        return finished
+
+    def cancel(self, task_id):
+        """
+        Cancels the search round, it is finished when the workers return the running tasks.
+        :param task_id: Identifier of the search round
+        """
+        search_round = self._rounds.get(task_id)
+        if search_round is not None and not search_round.cancelled:
+            self._executor.cancel(search_round.cancel(), task_id)
+
+    def step(self, timeout=None):
+        """
+        Waits for the next result, but not longer than the nearest deadline.
+        The rounds whose deadline passed are cancelled.
+        :param timeout: Maximum waiting time in seconds, or None to wait until a result arrives or a deadline passes
+        :return: List of the rounds which are finished
+        """
+        finished = self._finished()
+        if finished or not self._rounds:
+            return finished
+
+        for search_round in list(self._rounds.values()):
+            if search_round.deadline is None or search_round.cancelled:
+                continue
+            remaining = search_round.deadline - time.time()
+            if remaining <= 0:
+                self.cancel(search_round.task_id)
+            elif timeout is None or remaining < timeout:
+                timeout = remaining
+
+        finished = self._finished()
+        if finished:
+            return finished
+
+        # get the WorkerMessage
+        start = time.time()
+        received = self._executor.receive(timeout)
+        if self._statistics is not None:
+            self._statistics.add_wait(time.time() - start)
+        if received is not None:
+            worker, evaluation = received
+            search_round = self._rounds[evaluation.task_id]
+            search_round.record(worker, evaluation)
+            # the other workers of the round search with the tightened windows
+            for bound_worker, message in search_round.bounds():
+                self._executor.bound(bound_worker, message)
+            # the worker is free, give it the next task
+            self._idle.append(worker)
+            self._assign()
+        return self._finished()
+
+    def run(self, search_round):
+        """
+        Runs the search round until it is finished.
+        :param search_round: SearchRound
+        :return: Dictionary of the evaluations by the column, or None if the round was cancelled
+        """
+        self.add(search_round)
+        while search_round.task_id in self._rounds:
+            self.step()
+        return search_round.result()
+
+
+class MoveSearch:
+    """
+    Class MoveSearch finds the evaluations of all columns for the next move on the board.
+    With the time budget the search is repeated with increasing depth until the budget runs out,
+    and the results of the deepest finished search are used.
+    """
+    def __init__(self, board, arguments, task_ids, workers, statistics=None, pondering=False):
+        """
+        Initialization method.
+        :param board: The game board, it must not change until the search is finished
+        :param arguments: Parsed command line arguments
+        :param task_ids: Iterator of the identifiers for the search rounds
+        :param workers: Number of the workers which are expected to work on the search
+        :param statistics: SearchStatistics which gets the counters of the tasks, or None
+        :param pondering: True if the search runs before the move is made, its time budget starts with 'resume'
+        """
+        self._board = board
+        self._arguments = arguments
+        self._task_ids = task_ids
+        self._workers = workers
+        self._statistics = statistics
+        self._results = None
+        self._done = False
+        # the last search round
+        self._round = None
+        # durations of the tasks from the previous round predict the durations in the next one
+        self._costs = {}
+
+        if arguments.time is None:
+            self._deadline = None
+            self._depth = arguments.depth
+            self._max_depth = arguments.depth
+        else:
+            self._deadline = None if pondering else time.time() + arguments.time
+            self._depth = 1
+            # the search can't go deeper than the number of empty cells
+            self._max_depth = max(min(arguments.depth, board.cells - board.moves - 2), 1)
+        # the positions with few empty cells are solved by one round
+        self._endgame = board.cells - board.moves <= arguments.endgame
+
+    @property
+    def results(self):
+        """
+        Getter for the results property.
+        :return: Evaluations by the column, or None if no round is finished
+        """
+        return self._results
+
+    def next_round(self):
+        """
+        Creates the next search round.
+        :return: SearchRound, or None if the search is finished
+        """
+        if self._done:
+            return None
+        # the first search is never cancelled, so there is always a move to play
+        deadline = self._deadline if self._results is not None else None
+        if self._endgame:
+            self._round = EndgameRound(self._board, next(self._task_ids), self._arguments.engine, self._workers,
+                                       self._costs, self._statistics, self._arguments.bound_columns)
+        elif self._arguments.shared_bounds:
+            # the best column of the previous round is searched first
+            principal = None
+            if self._results is not None:
+                player = Player.COMPUTER if self._board.last_player == Player.HUMAN else Player.HUMAN
+                principal = Helper.get_best_column(self._results, self._arguments.engine, player)
+            self._round = BoundedRound(self._board, self._depth, next(self._task_ids), self._arguments.engine,
+                                       self._workers, deadline, self._costs, self._statistics, principal)
+        else:
+            self._round = SearchRound(self._board, self._depth, next(self._task_ids), self._arguments.engine,
+                                      self._workers, deadline, self._costs, self._statistics,
+                                      self._arguments.bound_columns)
+        return self._round
+
+    def resume(self, workers):
+        """
+        Continues the pondering search as the search for the move which has been made.
+        The next rounds are split for all workers, and the time budget starts now.
+        :param workers: Number of the workers which are expected to work on the search
+        """
+        self._workers = workers
+        if self._arguments.time is None or self._deadline is not None:
+            return
+        self._deadline = time.time() + self._arguments.time
+        # the first search is never cancelled
+        if self._results is not None and not self._done:
+            self._round.deadline = self._deadline
+
+    def finish_round(self, search_round):
+        """
+        Takes the results of the finished search round.
+        :param search_round: SearchRound made by the method 'next_round'
+        """
+        evaluate_results = search_round.result()
+        if evaluate_results is None:
+            self._done = True
+            return
+        self._results = Helper.get_max_evaluation(evaluate_results, self._board, search_round.engine)
+        # the bounds are not evaluations, the columns are only known to be worse than the best one
+        for col in search_round.bounded_columns:
+            self._results[col] = BOUNDED_COLUMN
+        self._depth += 1
+        if self._endgame or self._depth > self._max_depth or (self._deadline is not None and
+                                                               time.time() > self._deadline):
+            self._done = True
+        # the wins and the losses of the alpha-beta search are proven, the deeper search can't change them
+        if self._arguments.engine == ENGINE_ALPHABETA:
+            player = Player.COMPUTER if self._board.last_player == Player.HUMAN else Player.HUMAN
+            best = self._results[Helper.get_best_column(self._results, self._arguments.engine, player)]
+            if best in (COMPUTER_WIN, PLAYER_WIN):
+                self._done = True
+
+
+def search(executor, board, arguments, task_ids, statistics=None):
+    """
+    Finds the evaluations of all columns for the next move.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param board: The game board
+    :param arguments: Parsed command line arguments
+    :param task_ids: Iterator of the identifiers for the search rounds
+    :param statistics: SearchStatistics which gets the counters of the tasks, or None
+    :return: Evaluations by the column
+    """
+    scheduler = Scheduler(executor, statistics)
+    move_search = MoveSearch(board, arguments, task_ids, scheduler.workers, statistics)
+    search_round = move_search.next_round()
+
+    while search_round is not None:
+        scheduler.run(search_round)
+        move_search.finish_round(search_round)
+        search_round = move_search.next_round()
+
+    return move_search.results
@@ -0,0 +1,222 @@
+from Board import Board
+from Board import Player
+from Constants import *
+
+import Helper
+import Instrumentation
+from Instrumentation import SearchStatistics
+import Scheduler
+
+import itertools
+import sys
+import time
+
+
+class Game:
+    """
+    Class Game represents one game of the self-play, where the engine makes the moves of both players.
+    """
+    def __init__(self, number, opening, dimensions=DEFAULT_DIMENSIONS):
+        """
+        Initialization method. Plays the opening.
+        :param number: Number of the game
+        :param opening: List of the columns of the opening moves
+        :param dimensions: Tuple (rows, columns, win length) of the board
+        """
+        self._number = number
+        self._board = Board(*dimensions)
+        self._played = []
+        self._winner = None
+        self._finished = False
+        self._search = None
+
+        for col in opening:
+            if not self.play(col):
+                break
+
+    @property
+    def number(self):
+        """
+        Getter for the number property.
+        :return: Number of the game
+        """
+        return self._number
+
+    @property
+    def board(self):
+        """
+        Getter for the board property.
+        :return: The game board
+        """
+        return self._board
+
+    @property
+    def finished(self):
+        """
+        Getter for the finished property.
+        :return: True if the game is over
+        """
+        return self._finished
+
+    @property
+    def search(self):
+        """
+        Getter for the search property.
+        :return: MoveSearch of the next move, or None
+        """
+        return self._search
+
+    @search.setter
+    def search(self, move_search):
+        """
+        Setter for the search property.
+        :param move_search: MoveSearch of the next move
+        """
+        self._search = move_search
+
+    def play(self, column):
+        """
+        Makes the move and checks if the game is over.
+        :param column: Column of the move
+        :return: False if the game is over, True otherwise
+        """
+        if self._finished or not Helper.is_move_legal(self._board, column):
+            raise ValueError('Illegal move ' + str(column) + ' in the game ' + str(self._number) + '!')
+        self._board.make_a_move(column)
+        self._played.append(column)
+
+        if Helper.is_game_finished(self._board, column):
+            self._winner = self._board.last_player
+            self._finished = True
+        elif self._board.moves == self._board.rows * self._board.columns:
+            self._finished = True
+        return not self._finished
+
+    def result(self):
+        """
+        Result of the finished game.
+        :return: COMPUTER_WIN, PLAYER_WIN or TIE
+        """
+        if self._winner == Player.COMPUTER:
+            return COMPUTER_WIN
+        if self._winner == Player.HUMAN:
+            return PLAYER_WIN
+        return TIE
+
+    def moves(self):
+        """
+        Moves of the game.
+        :return: String with the columns of the moves, separated by spaces if there are more than ten columns
+        """
+        return format_moves(self._played, self._board.columns)
+
+
+def format_moves(moves, columns):
+    """
+    Writes the moves as a string.
+    :param moves: Columns of the moves
+    :param columns: Number of columns
+    :return: String with the columns of the moves, separated by spaces if there are more than ten columns
+    """
+    return (' ' if columns > 10 else '').join(str(col) for col in moves)
+
+
+def parse_moves(text, columns):
+    """
+    Reads the moves written by the function 'format_moves'.
+    :param text: String with the columns of the moves
+    :param columns: Number of columns
+    :return: List of the columns of the moves
+    """
+    if columns > 10:
+        return [int(col) for col in text.split()]
+    return [int(col) for col in text if not col.isspace()]
+
+
+def read_openings(arguments):
+    """
+    Reads the openings of the games, one line with the columns of the moves per game.
+    Without the file of the openings, every game starts with a different pair of moves.
+    :param arguments: Parsed command line arguments
+    :return: List of the openings, every one is a list of the columns
+    """
+    if arguments.openings is None:
+        return [list(moves) for moves in itertools.product(range(arguments.columns), repeat=2)]
+    with open(arguments.openings) as openings_file:
+        openings = [line.strip() for line in openings_file]
+    return [parse_moves(opening, arguments.columns) for opening in openings if opening]
+
+
+def self_play(executor, arguments):
+    """
+    Plays the games where the engine plays against itself. All games are played at the same time,
+    so the tasks of the different games are mixed, and the workers don't wait for the moves of one game.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param arguments: Parsed command line arguments
+    """
+    openings = read_openings(arguments)
+    count = arguments.games if arguments.games is not None else len(openings)
+    games = [Game(number, openings[number % len(openings)], arguments.dimensions) for number in range(count)]
+    task_ids = itertools.count()
+    statistics = SearchStatistics()
+    scheduler = Scheduler.Scheduler(executor, statistics)
+    # the games share the workers, so the tasks are split only if there are fewer games than workers
+    workers = max(1, scheduler.workers // max(1, len(games)))
+    # the game by its running search round
+    running = {}
+    moves = 0
+    results = {COMPUTER_WIN: 0, PLAYER_WIN: 0, TIE: 0}
+    start = time.time()
+
+    def next_round(game):
+        search_round = game.search.next_round()
+        if search_round is None:
+            return False
+        running[search_round.task_id] = game
+        scheduler.add(search_round)
+        return True
+
+    def start_move(game):
+        game.search = Scheduler.MoveSearch(game.board, arguments, task_ids, workers, statistics)
+        next_round(game)
+
+    def finish_game(game):
+        results[game.result()] += 1
+        print(str(game.number) + ': ' + game.moves() + ' ' + str(game.result()))
+        sys.stdout.flush()
+
+    for game in games:
+        if game.finished:
+            finish_game(game)
+        else:
+            start_move(game)
+
+    while scheduler.active:
+        for search_round in scheduler.step():
+            game = running.pop(search_round.task_id)
+            game.search.finish_round(search_round)
+            if next_round(game):
+                continue
+
+            # the search for the move is finished
+            player = Player.COMPUTER if game.board.last_player == Player.HUMAN else Player.HUMAN
+            game.play(Helper.get_best_column(game.search.results, arguments.engine, player))
+            moves += 1
+            if game.finished:
+                finish_game(game)
+            else:
+                start_move(game)
+
+    duration = time.time() - start
+    print('games: ' + str(len(games)) + ', moves: ' + str(moves) + ', time: ' + FORMATTING.format(duration) + ' s')
+    print('games/s: ' + FORMATTING.format(len(games) / duration) + ', moves/s: ' + FORMATTING.format(moves / duration))
+    print('computer wins: ' + str(results[COMPUTER_WIN]) + ', player wins: ' + str(results[PLAYER_WIN]) +
+          ', ties: ' + str(results[TIE]))
+    report = statistics.report(executor.workers)
+    if arguments.timing:
+        print('\n'.join(Instrumentation.format_report(report)))
+    if arguments.stats is not None:
+        report['games'] = len(games)
+        report['moves'] = moves
+        Instrumentation.dump(arguments.stats, report)
+    sys.stdout.flush()
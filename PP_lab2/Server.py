@@ -0,0 +1,313 @@
+from Board import Player
+from Constants import *
+
+import Analysis
+import Helper
+import Instrumentation
+from Instrumentation import SearchStatistics
+import Scheduler
+from SelfPlay import Game
+
+import asyncio
+import copy
+import itertools
+import sys
+
+
+class Session:
+    """
+    Class Session is one connection of the server, it plays one game at a time against its client.
+    Every session has its own settings, so the games can have different time budgets.
+    """
+    def __init__(self, number, arguments):
+        """
+        Initialization method.
+        :param number: Number of the session
+        :param arguments: Parsed command line arguments, the session gets its own copy
+        """
+        self._number = number
+        self._arguments = copy.copy(arguments)
+        self._game = Game(number, [], arguments.dimensions)
+        # True if the client has given the depth of the search
+        self._depth_given = False
+        # the search round of the move which is searched, and the future of its evaluations
+        self._round_id = None
+        self._future = None
+
+    @property
+    def number(self):
+        """
+        Getter for the number property.
+        :return: Number of the session
+        """
+        return self._number
+
+    @property
+    def arguments(self):
+        """
+        Getter for the arguments property.
+        :return: Settings of the session
+        """
+        return self._arguments
+
+    @property
+    def game(self):
+        """
+        Getter for the game property.
+        :return: Game which is played
+        """
+        return self._game
+
+    @property
+    def round_id(self):
+        """
+        Getter for the round_id property.
+        :return: Identifier of the running search round, or None
+        """
+        return self._round_id
+
+    @round_id.setter
+    def round_id(self, round_id):
+        """
+        Setter for the round_id property.
+        :param round_id: Identifier of the running search round, or None
+        """
+        self._round_id = round_id
+
+    @property
+    def future(self):
+        """
+        Getter for the future property.
+        :return: Future of the evaluations of the searched move, or None
+        """
+        return self._future
+
+    @future.setter
+    def future(self, future):
+        """
+        Setter for the future property.
+        :param future: Future of the evaluations of the searched move
+        """
+        self._future = future
+
+    def new_game(self):
+        """
+        Starts a new game with the same settings.
+        """
+        self._game = Game(self._number, [], self._arguments.dimensions)
+
+    def change(self, name, value):
+        """
+        Changes the setting of the search of the next moves. If the client has not given the depth,
+        the time budget also sets the maximum depth, the same way as the command line does.
+        :param name: Name of the setting, 'time' or 'depth'
+        :param value: New value of the setting
+        """
+        setattr(self._arguments, name, value)
+        if name == 'depth':
+            self._depth_given = True
+        elif not self._depth_given:
+            self._arguments.depth = Analysis.default_depth(self._arguments.engine, value, self._arguments.dimensions)
+
+
+class AnalysisServer:
+    """
+    Class AnalysisServer plays the games of many clients at the same time with one pool of the workers.
+    The clients connect to the local socket, and every connection sends the lines of the protocol:
+    the column of the players move, 'time <seconds>' or 'depth <depth>' to change the search of the next moves,
+    where the time without the depth searches up to the whole board, and 'new' to start a new game. The move is answered by the evaluations, the line 'move <column>'
+    with the move of the computer, and the line 'end <result>' when the game is over.
+    The searches of all games share the scheduler, which gives the workers to the games in turns
+    and cancels the rounds whose deadline passed, so one long search doesn't hold up the others.
+    """
+    def __init__(self, executor, arguments):
+        """
+        Initialization method.
+        :param executor: MPIExecutor or LocalExecutor which runs the tasks
+        :param arguments: Parsed command line arguments
+        """
+        self._arguments = arguments
+        self._executor = executor
+        self._scheduler = Scheduler.Scheduler(executor)
+        self._task_ids = itertools.count()
+        self._session_ids = itertools.count()
+        # the session by its running search round
+        self._running = {}
+        self._searching = 0
+        self._wakeup = None
+
+    async def run(self):
+        """
+        Accepts the clients until the server is stopped.
+        """
+        self._wakeup = asyncio.Event()
+        address = self._arguments.serve
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self._handle, host, int(port))
+        else:
+            server = await asyncio.start_unix_server(self._handle, address)
+        print('serving on ' + address)
+        sys.stdout.flush()
+        async with server:
+            await self._pump()
+
+    async def _pump(self):
+        """
+        Collects the results of the workers, the clients are served between them.
+        """
+        while True:
+            if not self._scheduler.active:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            for search_round in self._scheduler.step(SERVER_INTERVAL):
+                self._finish_round(search_round)
+            await asyncio.sleep(0)
+
+    def _start_round(self, session, move_search):
+        """
+        Starts the next search round of the session, or gives the evaluations if the search is finished.
+        :param session: Session which waits for the move
+        :param move_search: MoveSearch of the move
+        """
+        search_round = move_search.next_round()
+        if search_round is None:
+            session.round_id = None
+            if not session.future.done():
+                session.future.set_result(move_search.results)
+            return
+        session.round_id = search_round.task_id
+        self._running[search_round.task_id] = (session, move_search)
+        self._scheduler.add(search_round)
+        self._wakeup.set()
+
+    def _finish_round(self, search_round):
+        """
+        Takes the results of the finished search round.
+        :param search_round: SearchRound
+        """
+        session, move_search = self._running.pop(search_round.task_id)
+        # the client has left, its round has been cancelled
+        if session.future.done():
+            return
+        move_search.finish_round(search_round)
+        self._start_round(session, move_search)
+
+    async def _search(self, session, statistics):
+        """
+        Searches the move of the computer in the game of the session.
+        :param session: Session whose game is searched
+        :param statistics: SearchStatistics which gets the counters of the tasks
+        :return: Evaluations by the column
+        """
+        # the tasks are split only if there are fewer games than workers
+        self._searching += 1
+        workers = max(1, self._scheduler.workers // self._searching)
+        move_search = Scheduler.MoveSearch(session.game.board, session.arguments, self._task_ids, workers,
+                                           statistics)
+        session.future = asyncio.get_running_loop().create_future()
+        try:
+            self._start_round(session, move_search)
+            return await session.future
+        finally:
+            self._searching -= 1
+
+    def _cancel(self, session):
+        """
+        Cancels the search of the session whose client has left.
+        :param session: Session
+        """
+        if session.future is not None and not session.future.done():
+            session.future.cancel()
+        if session.round_id is not None:
+            self._scheduler.cancel(session.round_id)
+            session.round_id = None
+
+    async def _play(self, session, column):
+        """
+        Plays the players move and the answer of the computer.
+        :param session: Session of the client
+        :param column: Column of the players move
+        :return: Lines of the answer
+        """
+        game = session.game
+        if game.finished:
+            return ['end ' + str(game.result())]
+        if not Helper.is_move_legal(game.board, column):
+            return ['illegal']
+        if not game.play(column):
+            return ['end ' + str(game.result())]
+
+        statistics = SearchStatistics()
+        results = await self._search(session, statistics)
+        player = Player.COMPUTER if game.board.last_player == Player.HUMAN else Player.HUMAN
+        best_col = Helper.get_best_column(results, session.arguments.engine, player)
+        if self._arguments.stats is not None:
+            report = statistics.report(self._executor.workers)
+            report['session'] = session.number
+            report['moves'] = game.board.moves
+            Instrumentation.dump(self._arguments.stats, report)
+
+        lines = [', '.join(res if res in (FULL_COLUMN, BOUNDED_COLUMN) else FORMATTING.format(res) for res in results),
+                 'move ' + str(best_col)]
+        if not game.play(best_col):
+            lines.append('end ' + str(game.result()))
+        return lines
+
+    async def _answer(self, session, line):
+        """
+        Answers one line of the client.
+        :param session: Session of the client
+        :param line: Line without the end of line
+        :return: Lines of the answer
+        """
+        words = line.split()
+        if not words:
+            return []
+        if words[0] == 'new':
+            session.new_game()
+            return ['ok']
+        if words[0] in ('time', 'depth') and len(words) == 2:
+            try:
+                value = float(words[1]) if words[0] == 'time' else int(words[1])
+            except ValueError:
+                return ['error ' + line]
+            if value <= 0:
+                return ['error ' + line]
+            session.change(words[0], value)
+            return ['ok']
+        try:
+            column = int(line)
+        except ValueError:
+            return ['error ' + line]
+        return await self._play(session, column)
+
+    async def _handle(self, reader, writer):
+        """
+        Serves one client until it closes the connection.
+        :param reader: StreamReader of the connection
+        :param writer: StreamWriter of the connection
+        """
+        session = Session(next(self._session_ids), self._arguments)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for answer in await self._answer(session, line.decode().strip()):
+                    writer.write((answer + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._cancel(session)
+            writer.close()
+
+
+def serve(executor, arguments):
+    """
+    Runs the analysis server until it is stopped.
+    :param executor: MPIExecutor or LocalExecutor which runs the tasks
+    :param arguments: Parsed command line arguments
+    """
+    asyncio.run(AnalysisServer(executor, arguments).run())
@@ -0,0 +1,135 @@
+from Constants import *
+
+
+def init_windows(rows, columns, height, length):
+    """
+    Finds all windows of the winning length in a line, in every direction.
+    :param rows: Number of the rows
+    :param columns: Number of the columns
+    :param height: Number of bits reserved for one column
+    :param length: Number of tokens in a line which win the game
+    :return: Number of the windows, and the windows which contain the cell, by the bit of the cell
+    """
+    windows = []
+    # (column step, row step) of the vertical, horizontal and both diagonal lines
+    for column_step, row_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for column in range(columns):
+            for row in range(rows):
+                cells = [(column + i * column_step, row + i * row_step) for i in range(length)]
+                if all(0 <= col < columns and 0 <= r < rows for col, r in cells):
+                    windows.append([col * height + r for col, r in cells])
+
+    cell_windows = [[] for x in range(columns * height)]
+    for window, cells in enumerate(windows):
+        for cell in cells:
+            cell_windows[cell].append(window)
+    return len(windows), cell_windows
+
+
+def init_values(length):
+    """
+    Scores of the windows by the number of the tokens of both players in them.
+    Only the windows with the tokens of one player can still be completed, so only they are scored.
+    The windows which miss one or two tokens are scored, like the open threes and twos of Connect4.
+    :param length: Number of tokens in a line which win the game
+    :return: Table of the scores, indexed by the number of the computer tokens and the number of the player tokens
+    """
+    weights = {length - 2: TWO_WEIGHT, length - 1: THREE_WEIGHT}
+    values = [[0] * (length + 1) for x in range(length + 1)]
+    for count, weight in weights.items():
+        if count > 0:
+            values[count][0] = weight
+            values[0][count] = -weight
+    return values
+
+
+# windows by the dimensions of the board
+WINDOWS = {}
+
+
+class StaticEvaluator:
+    """
+    Class StaticEvaluator scores the position without the search, from the perspective of the computer.
+    The open windows which miss one or two tokens and the tokens in the center column are counted,
+    or in both center columns of the even board.
+    The number of the tokens of both players is kept for every window and updated with every move,
+    so the score changes only by the windows which contain the new token.
+    """
+    def __init__(self, rows, columns, height, length, computer_mask, human_mask):
+        """
+        Initialization method. Counts the tokens of the given position.
+        :param rows: Number of the rows
+        :param columns: Number of the columns
+        :param height: Number of bits reserved for one column
+        :param length: Number of tokens in a line which win the game
+        :param computer_mask: Bitboard of the computer tokens
+        :param human_mask: Bitboard of the player tokens
+        """
+        dimensions = (rows, columns, height, length)
+        if dimensions not in WINDOWS:
+            WINDOWS[dimensions] = init_windows(rows, columns, height, length) + (init_values(length),)
+        count, self._cell_windows, self._values = WINDOWS[dimensions]
+        self._computer_counts = [0] * count
+        self._human_counts = [0] * count
+        # the even board has two center columns, so the score of the mirrored position stays the same
+        self._center = (((columns - 1) // 2) * height, (columns // 2) * height + rows)
+        self._score = 0
+
+        for cell in range(columns * height):
+            if computer_mask >> cell & 1:
+                self.add(cell, True)
+            elif human_mask >> cell & 1:
+                self.add(cell, False)
+
+    def add(self, cell, computer):
+        """
+        Adds the token into the counters.
+        :param cell: Bit of the cell
+        :param computer: True for the computer token, False for the player token
+        """
+        counts = self._computer_counts if computer else self._human_counts
+        values = self._values
+        computer_counts = self._computer_counts
+        human_counts = self._human_counts
+        score = self._score
+        for window in self._cell_windows[cell]:
+            score -= values[computer_counts[window]][human_counts[window]]
+            counts[window] += 1
+            score += values[computer_counts[window]][human_counts[window]]
+        if self._center[0] <= cell < self._center[1]:
+            score += CENTER_WEIGHT if computer else -CENTER_WEIGHT
+        self._score = score
+
+    def remove(self, cell, computer):
+        """
+        Removes the token from the counters.
+        :param cell: Bit of the cell
+        :param computer: True for the computer token, False for the player token
+        """
+        counts = self._computer_counts if computer else self._human_counts
+        values = self._values
+        computer_counts = self._computer_counts
+        human_counts = self._human_counts
+        score = self._score
+        for window in self._cell_windows[cell]:
+            score -= values[computer_counts[window]][human_counts[window]]
+            counts[window] -= 1
+            score += values[computer_counts[window]][human_counts[window]]
+        if self._center[0] <= cell < self._center[1]:
+            score -= CENTER_WEIGHT if computer else -CENTER_WEIGHT
+        self._score = score
+
+    @property
+    def score(self):
+        """
+        Getter for the score property.
+        :return: Sum of the scores of the windows and the center tokens
+        """
+        return self._score
+
+    def evaluation(self):
+        """
+        Evaluation of the position, it stays between the win of the player and the win of the computer.
+        :return: Score scaled into the interval [-HEURISTIC_LIMIT, HEURISTIC_LIMIT]
+        """
+        return max(-HEURISTIC_LIMIT, min(HEURISTIC_LIMIT, self._score / HEURISTIC_SCALE))
@@ -0,0 +1,287 @@
+from Constants import *
+
+import numpy as np
+import struct
+
+
+class Bound:
+    """
+    Helper enum for the type of the stored score.
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TranspositionTable:
+    """
+    Class TranspositionTable represents a cache of already evaluated positions.
+    Positions are identified by the Zobrist hash of the board; with every score the remaining depth
+    and the bound type are stored.
+    The table has a fixed number of entries. With the 'always' policy a new entry replaces the old one,
+    and with the 'depth' policy every slot has two entries: the first one keeps the deepest result,
+    and the second one is always replaced.
+    """
+    def __init__(self, size=TABLE_SIZE, policy=REPLACE_DEPTH):
+        """
+        Initialization method.
+        :param size: Maximum number of entries
+        :param policy: Replacement policy, 'always' or 'depth'
+        """
+        if policy not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError('Unknown replacement policy!')
+
+        self._policy = policy
+        self._ways = 2 if policy == REPLACE_DEPTH else 1
+        self._slots = max(size // self._ways, 1)
+        self._size = self._slots * self._ways
+        self._keys = [None] * self._size
+        self._scores = [TIE] * self._size
+        self._depths = [-1] * self._size
+        self._bounds = [Bound.EXACT] * self._size
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._overwrites = 0
+
+    def lookup(self, key, depth, exact=False):
+        """
+        Finds the stored result for the position.
+        :param key: Hash of the position
+        :param depth: Remaining depth of the search
+        :param exact: If True, only the result of the search with the same depth can be used
+        :return: Tuple (score, bound), or None if there is no usable entry
+        """
+        index = (key % self._slots) * self._ways
+        for i in range(index, index + self._ways):
+            if self._keys[i] == key:
+                stored = self._depths[i]
+                if stored == depth or (stored > depth and not exact):
+                    self._hits += 1
+                    return self._scores[i], self._bounds[i]
+        self._misses += 1
+        return None
+
+    def store(self, key, score, depth, bound=Bound.EXACT):
+        """
+        Stores the result for the position.
+        :param key: Hash of the position
+        :param score: Evaluation of the position
+        :param depth: Remaining depth of the search
+        :param bound: Type of the score
+        """
+        index = (key % self._slots) * self._ways
+        # the deeper result stays in the first entry, even for the same position, everything else goes to the second one
+        if self._ways == 2 and self._depths[index] > depth:
+            index += 1
+
+        if self._keys[index] is not None and self._keys[index] != key:
+            self._overwrites += 1
+        self._keys[index] = key
+        self._scores[index] = score
+        self._depths[index] = depth
+        self._bounds[index] = bound
+        self._stores += 1
+
+    def clear(self):
+        """
+        Removes all the entries and resets the counters.
+        """
+        self.__init__(self._size, self._policy)
+
+    @property
+    def size(self):
+        """
+        Getter for the size property.
+        :return: Maximum number of entries
+        """
+        return self._size
+
+    @property
+    def hits(self):
+        """
+        Getter for the hits property.
+        :return: Number of successful lookups
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Getter for the misses property.
+        :return: Number of lookups without a usable entry
+        """
+        return self._misses
+
+    @property
+    def stores(self):
+        """
+        Getter for the stores property.
+        :return: Number of stored results
+        """
+        return self._stores
+
+    @property
+    def overwrites(self):
+        """
+        Getter for the overwrites property.
+        :return: Number of entries replaced by a different position
+        """
+        return self._overwrites
+
+
+class SharedTranspositionTable:
+    """
+    Class SharedTranspositionTable is a transposition table in a memory buffer which several processes share,
+    so the workers on one machine reuse the positions evaluated by each other.
+    It has the interface of the TranspositionTable, and the counters are kept by every process for itself.
+    Every entry has three 64-bit words: the key mixed with the other two words, the bits of the score,
+    and the depth with the bound. The entries are written without a lock; an entry which is read while another
+    process writes it gives a mixed key, which doesn't match, so the lookup only misses.
+    """
+    # number of the words of one entry
+    WORDS = 3
+
+    def __init__(self, buffer, size=SHARED_TABLE_SIZE, policy=REPLACE_DEPTH):
+        """
+        Initialization method. The buffer is not cleared, the entries of the other processes are kept.
+        :param buffer: Shared memory of the table, at least 'buffer_size(size)' bytes
+        :param size: Maximum number of entries
+        :param policy: Replacement policy, 'always' or 'depth'
+        """
+        if policy not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError('Unknown replacement policy!')
+
+        self._policy = policy
+        self._ways = 2 if policy == REPLACE_DEPTH else 1
+        self._slots = max(size // self._ways, 1)
+        self._size = self._slots * self._ways
+        self._words = memoryview(buffer).cast('B')[:SharedTranspositionTable.buffer_size(self._size)].cast('Q')
+        self._score_format = struct.Struct('d')
+        self._word_format = struct.Struct('Q')
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._overwrites = 0
+
+    @staticmethod
+    def buffer_size(size):
+        """
+        Size of the shared memory of the table.
+        :param size: Maximum number of entries
+        :return: Size in bytes
+        """
+        return size * SharedTranspositionTable.WORDS * 8
+
+    def _read(self, index):
+        """
+        Reads the entry. The depth is stored increased by one, so the empty entry has the depth -1.
+        :param index: Index of the entry
+        :return: Tuple (key, bits of the score, depth, bound)
+        """
+        base = index * SharedTranspositionTable.WORDS
+        check = self._words[base]
+        bits = self._words[base + 1]
+        info = self._words[base + 2]
+        return check ^ bits ^ info, bits, (info >> 2) - 1, info & 3
+
+    def lookup(self, key, depth, exact=False):
+        """
+        Finds the stored result for the position.
+        :param key: Hash of the position
+        :param depth: Remaining depth of the search
+        :param exact: If True, only the result of the search with the same depth can be used
+        :return: Tuple (score, bound), or None if there is no usable entry
+        """
+        index = (key % self._slots) * self._ways
+        for i in range(index, index + self._ways):
+            stored_key, bits, stored, bound = self._read(i)
+            if stored_key == key and stored >= 0:
+                if stored == depth or (stored > depth and not exact):
+                    self._hits += 1
+                    return self._score_format.unpack(self._word_format.pack(bits))[0], bound
+        self._misses += 1
+        return None
+
+    def store(self, key, score, depth, bound=Bound.EXACT):
+        """
+        Stores the result for the position.
+        :param key: Hash of the position
+        :param score: Evaluation of the position
+        :param depth: Remaining depth of the search
+        :param bound: Type of the score
+        """
+        index = (key % self._slots) * self._ways
+        stored_key, bits, stored, stored_bound = self._read(index)
+        # the deeper result stays in the first entry, even for the same position, everything else goes to the second one
+        if self._ways == 2 and stored > depth:
+            index += 1
+            stored_key, bits, stored, stored_bound = self._read(index)
+
+        if stored >= 0 and stored_key != key:
+            self._overwrites += 1
+        bits = self._word_format.unpack(self._score_format.pack(score))[0]
+        info = (depth + 1) << 2 | bound
+        base = index * SharedTranspositionTable.WORDS
+        self._words[base] = key ^ bits ^ info
+        self._words[base + 1] = bits
+        self._words[base + 2] = info
+        self._stores += 1
+
+    def clear(self):
+        """
+        Removes all the entries, for all the processes, and resets the counters.
+        """
+        words = np.frombuffer(self._words, dtype=np.uint64)
+        words[:] = 0
+        del words
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._overwrites = 0
+
+    def release(self):
+        """
+        Releases the shared memory, the table can't be used any more.
+        """
+        self._words.release()
+
+    @property
+    def size(self):
+        """
+        Getter for the size property.
+        :return: Maximum number of entries
+        """
+        return self._size
+
+    @property
+    def hits(self):
+        """
+        Getter for the hits property.
+        :return: Number of successful lookups of this process
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Getter for the misses property.
+        :return: Number of lookups of this process without a usable entry
+        """
+        return self._misses
+
+    @property
+    def stores(self):
+        """
+        Getter for the stores property.
+        :return: Number of results stored by this process
+        """
+        return self._stores
+
+    @property
+    def overwrites(self):
+        """
+        Getter for the overwrites property.
+        :return: Number of entries replaced by a different position by this process
+        """
+        return self._overwrites